@@ -0,0 +1,15 @@
+"""Import-time setup shared by the backend scripts: import path and strands_agents stub."""
+import os
+import sys
+
+# Backend directory, so its packages import no matter where a script is run from
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# Use the stub when the strands_agents package is not installed
+try:
+    import strands_agents
+except ImportError:
+    import strands_agents_stub
+    sys.modules['strands_agents'] = strands_agents_stub
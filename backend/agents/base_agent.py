@@ -2,39 +2,35 @@
 Base agent implementation that works without strands_agents.
 This provides a simplified agent framework for testing.
 """
-from typing import Dict, List, Callable, Any
-import asyncio
-from functools import wraps
+from typing import Callable, Dict
+from utils.tool_runtime import ToolRuntimeMixin
 
 
-class BaseAgent:
+class BaseAgent(ToolRuntimeMixin):
     """Base agent class that can run independently."""
     
+    __slots__ = ("name", "description", "running", "_tool_entries", "_executor", "tool_call_counts", "_rate_limits", "on_state_change")
+    
     def __init__(self, name: str, description: str = ""):
         self.name = name
         self.description = description
-        self.tools = {}
         self.running = False
+        self._init_tool_runtime()
+    
+    @property
+    def tools(self) -> Dict:
+        """Registered tools: tool name -> (func, is_coroutine)."""
+        return self._tool_entries
     
     def register_tool(self, func: Callable):
         """Register a tool function."""
-        self.tools[func.__name__] = func
-    
-    async def execute_tool(self, tool_name: str, **kwargs):
-        """Execute a tool by name."""
-        if tool_name not in self.tools:
-            raise ValueError(f"Tool '{tool_name}' not found")
-        
-        func = self.tools[tool_name]
-        if asyncio.iscoroutinefunction(func):
-            return await func(**kwargs)
-        else:
-            return func(**kwargs)
+        self._register_tool(func.__name__, func)
     
     def get_status(self) -> Dict:
         """Get agent status."""
         return {
             "name": self.name,
             "running": self.running,
-            "description": self.description
+            "description": self.description,
+            "tool_call_counts": dict(self.tool_call_counts)
         }
@@ -1,17 +1,124 @@
 """CloudTrail Monitoring Agent for continuous activity monitoring."""
-from datetime import datetime, timedelta
-from typing import Dict, List
+from collections import ChainMap, deque
+from datetime import datetime, timedelta, timezone
+from typing import Deque, Dict, List, Optional, Tuple
 import asyncio
+import logging
 import time
 from strands_agents import Agent, Tool
 from tools.cloudtrail_tools import (
     fetch_cloudtrail_logs,
+    fetch_cloudtrail_logs_stream,
     analyze_cloudtrail_insights,
     parse_cloudtrail_event
 )
 from tools.alerting_tools import send_sns_notification, send_slack_alert
+from tools.storage_tools import archive_items
+from utils.alert_buffer import AlertBuffer, build_digest
 from config import settings
 
+logger = logging.getLogger(__name__)
+
+
+# Tools that call quota-bound AWS APIs and are rate limited per agent
+RATE_LIMITED_TOOLS = (
+    "fetch_cloudtrail_logs",
+    "fetch_cloudtrail_logs_stream",
+    "analyze_cloudtrail_insights",
+    "send_sns_notification"
+)
+
+# Most recent suspicious events kept in memory; older ones live in the history table
+RECENT_EVENTS_SIZE = 10_000
+
+# Event IDs remembered across checks, so an event fetched again by an
+# overlapping window is only processed once
+SEEN_EVENT_IDS_SIZE = 100_000
+
+# CloudTrail delivers log files several minutes after the events in them, so
+# each check re-reads this far before the previous one; repeats are dropped
+# by event ID
+DELIVERY_LOOKBACK = timedelta(minutes=15)
+
+# Upper bound on in-flight tool calls when fanning out over a batch of events
+MAX_CONCURRENT_TOOL_CALLS = 32
+
+# Event names that are always treated as suspicious
+HIGH_RISK_EVENTS = frozenset({
+    "DeleteBucket",
+    "TerminateInstances",
+    "DeleteDBInstance",
+    "DeleteUser",
+    "PutBucketPolicy",
+    "AttachRolePolicy",
+    "CreateAccessKey",
+    "DeleteAccessKey"
+})
+
+# User agent substrings that indicate automated scanning
+SUSPICIOUS_UA_TOKENS = ("bot", "scanner")
+
+# Alert body for suspicious events, filled with str.format_map per alert
+_SUSPICIOUS_TMPL = """
+Suspicious CloudTrail Event Detected
+
+Event: {event_name}
+Time: {event_time}
+User: {user_arn}
+Source IP: {source_ip}
+Region: {aws_region}
+
+Please review this event immediately.
+"""
+
+# Fallback values for fields missing from an event
+_SUSPICIOUS_DEFAULTS = {
+    "event_name": "Unknown",
+    "event_time": "Unknown",
+    "user_arn": "Unknown",
+    "source_ip": "Unknown",
+    "aws_region": "Unknown"
+}
+
+
+def _flag_suspicious(event: Dict) -> bool:
+    """Apply the suspicious-activity rules to a parsed event."""
+    # Check for high-risk event names
+    if event.get("event_name", "") in HIGH_RISK_EVENTS:
+        return True
+    
+    # Check for errors (potential unauthorized access attempts)
+    if event.get("error_code") or event.get("error_message"):
+        return True
+    
+    # Check for unusual source IPs (would need IP whitelist in production)
+    # Check for unusual user agents
+    user_agent = event.get("user_agent", "").lower()
+    if any(token in user_agent for token in SUSPICIOUS_UA_TOKENS):
+        return True
+    
+    # Check for read-only violations
+    if not event.get("read_only", True) and event.get("management_event", True):
+        # Non-read operations are potentially suspicious
+        # This is a simplified check - in production, you'd have more sophisticated rules
+        pass
+    
+    return False
+
+
+def classify(raw: Dict) -> Tuple[Dict, bool]:
+    """Parse a raw CloudTrail event and flag it as suspicious in one step."""
+    # parse_cloudtrail_event is pure Python, so it is called directly rather
+    # than through a per-event execute_tool round trip
+    parsed = parse_cloudtrail_event(raw)
+    return parsed, _flag_suspicious(parsed)
+
+
+async def _bounded(semaphore: asyncio.Semaphore, coro):
+    """Await a coroutine while holding a slot of the given semaphore."""
+    async with semaphore:
+        return await coro
+
 
 class CloudTrailMonitoringAgent(Agent):
     """
@@ -19,73 +126,102 @@ class CloudTrailMonitoringAgent(Agent):
     Runs 24/7 and detects unusual API call patterns, policy violations, and security threats.
     """
     
-    def __init__(self):
+    def __init__(self, event_bus: Optional[Deque[Dict]] = None):
         super().__init__(
             name="CloudTrailMonitoringAgent",
             description="Monitors AWS CloudTrail logs for suspicious activity and policy violations",
             tools=[
                 Tool(fetch_cloudtrail_logs),
+                Tool(fetch_cloudtrail_logs_stream),
                 Tool(analyze_cloudtrail_insights),
                 Tool(parse_cloudtrail_event),
                 Tool(send_sns_notification),
-                Tool(send_slack_alert)
+                Tool(send_slack_alert),
+                Tool(archive_items)
             ]
         )
         self.last_check_time = None
         self.running = False
-        self.suspicious_events = []
+        self._loop_task = None  # task running monitor_continuously, cancelled by stop()
+        self.suspicious_events = deque(maxlen=RECENT_EVENTS_SIZE)
         self.event_patterns = {}
+        self.event_bus = event_bus  # shared with UserAnalyticsAgent, if given
+        self._seen_event_ids = set()
+        self._seen_event_order = deque()  # oldest first, to evict from _seen_event_ids
+        self.alert_buffer = AlertBuffer(self.deliver_alerts)
+        
+        for tool_name in RATE_LIMITED_TOOLS:
+            self.limit_tool_rate(tool_name, settings.tool_rate_limit_per_second, settings.tool_rate_limit_burst)
     
     async def monitor_continuously(self):
         """Main continuous monitoring loop."""
         self.running = True
-        print(f"[{self.name}] Starting continuous monitoring...")
+        self._loop_task = asyncio.current_task()
+        self.notify_state_change()
+        self.alert_buffer.start()
+        logger.info("[%s] Starting continuous monitoring...", self.name)
         
-        while self.running:
-            try:
-                await self.check_cloudtrail_events()
-                await asyncio.sleep(settings.cloudtrail_check_interval_seconds)
-            except Exception as e:
-                print(f"[{self.name}] Error in monitoring loop: {e}")
-                await asyncio.sleep(60)  # Wait before retrying
-    
-    async def check_cloudtrail_events(self):
-        """Check for new CloudTrail events and analyze them."""
+        # Runs until the task is cancelled (see stop())
+        try:
+            while True:
+                try:
+                    processed = await self.check_cloudtrail_events()
+                    
+                    # Re-poll immediately while new events keep arriving; events
+                    # already processed are skipped by ID, so a re-listed day
+                    # counts as idle and the loop sleeps
+                    if processed == 0:
+                        await asyncio.sleep(settings.cloudtrail_check_interval_seconds)
+                except Exception as e:
+                    logger.error("[%s] Error in monitoring loop: %s", self.name, e)
+                    await asyncio.sleep(60)  # Wait before retrying
+        finally:
+            self.running = False
+            self._loop_task = None
+            self.notify_state_change()
+            await self.alert_buffer.stop()
+    
+    async def check_cloudtrail_events(self) -> int:
+        """Check for new CloudTrail events and analyze them. Returns the number of new events processed."""
         try:
-            # Calculate time range (last check to now)
-            end_time = datetime.utcnow()
+            # Calculate time range (last check to now, plus late deliveries)
+            end_time = datetime.now(timezone.utc)
             if self.last_check_time:
-                start_time = self.last_check_time
+                start_time = self.last_check_time - DELIVERY_LOOKBACK
             else:
                 # First run: check last hour
                 start_time = end_time - timedelta(hours=1)
             
-            print(f"[{self.name}] Checking events from {start_time} to {end_time}")
+            logger.info("[%s] Checking events from %s to %s", self.name, start_time, end_time)
             
-            # Fetch events
-            events = await self.execute_tool(
-                "fetch_cloudtrail_logs",
-                start_time=start_time.isoformat() + "Z",
-                end_time=end_time.isoformat() + "Z"
+            # Stream events page by page so analysis starts with the first log file
+            processed = 0
+            suspicious = []
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT_TOOL_CALLS)
+            pages = self.execute_tool_stream(
+                "fetch_cloudtrail_logs_stream",
+                start_time=start_time.isoformat(timespec="seconds"),
+                end_time=end_time.isoformat(timespec="seconds")
             )
+            try:
+                async for page in pages:
+                    page = self._new_events(page)
+                    if not page:
+                        continue
+                    processed += len(page)
+                    suspicious.extend(await self._process_page(page, semaphore))
+            finally:
+                # Stop the fetch (and its download workers) right away if
+                # processing a page fails or the check is cancelled
+                await pages.aclose()
             
-            if not events:
-                print(f"[{self.name}] No new events found")
+            if not processed:
+                logger.info("[%s] No new events found", self.name)
                 self.last_check_time = end_time
-                return
+                self.notify_state_change()
+                return 0
             
-            print(f"[{self.name}] Found {len(events)} events")
-            
-            # Analyze each event
-            suspicious_count = 0
-            for event in events:
-                parsed = await self.execute_tool("parse_cloudtrail_event", event=event)
-                
-                # Check for suspicious patterns
-                if await self.is_suspicious(parsed):
-                    suspicious_count += 1
-                    self.suspicious_events.append(parsed)
-                    await self.handle_suspicious_event(parsed)
+            logger.info("[%s] Found %s events", self.name, processed)
             
             # Check for unusual patterns using CloudTrail Insights
             insights = await self.execute_tool(
@@ -99,86 +235,114 @@ class CloudTrailMonitoringAgent(Agent):
             
             # Update last check time
             self.last_check_time = end_time
+            self.notify_state_change()
+            self.archive_history(suspicious)
             
-            print(f"[{self.name}] Analysis complete. Suspicious events: {suspicious_count}")
+            logger.info("[%s] Analysis complete. Suspicious events: %s", self.name, len(suspicious))
             
+            return processed
+        
         except Exception as e:
-            print(f"[{self.name}] Error checking CloudTrail events: {e}")
+            logger.error("[%s] Error checking CloudTrail events: %s", self.name, e)
             raise
     
-    async def is_suspicious(self, event: Dict) -> bool:
-        """Determine if an event is suspicious."""
-        # Check for high-risk event names
-        high_risk_events = [
-            "DeleteBucket",
-            "TerminateInstances",
-            "DeleteDBInstance",
-            "DeleteUser",
-            "PutBucketPolicy",
-            "AttachRolePolicy",
-            "CreateAccessKey",
-            "DeleteAccessKey"
-        ]
+    def _new_events(self, events: List[Dict]) -> List[Dict]:
+        """Drop events already processed by an earlier check and remember the rest."""
+        seen = self._seen_event_ids
+        order = self._seen_event_order
+        new_events = []
+        for event in events:
+            event_id = event.get("eventID")
+            if event_id:
+                if event_id in seen:
+                    continue
+                seen.add(event_id)
+                order.append(event_id)
+            new_events.append(event)
         
-        event_name = event.get("event_name", "")
-        if event_name in high_risk_events:
-            return True
+        while len(order) > SEEN_EVENT_IDS_SIZE:
+            seen.discard(order.popleft())
+        return new_events
+    
+    async def _process_page(self, events: List[Dict], semaphore: asyncio.Semaphore) -> List[Dict]:
+        """Analyze a page of raw events, alerting concurrently. Returns the suspicious events."""
+        # Parse and check each event in a single pass
+        parsed_events = []
+        suspicious = []
+        for event in events:
+            parsed, flagged = classify(event)
+            parsed_events.append(parsed)
+            if flagged:
+                suspicious.append(parsed)
         
-        # Check for errors (potential unauthorized access attempts)
-        if event.get("error_code") or event.get("error_message"):
-            return True
+        # Publish parsed events for user analytics
+        if self.event_bus is not None:
+            self.event_bus.extend(parsed_events)
         
-        # Check for unusual source IPs (would need IP whitelist in production)
-        # Check for unusual user agents
-        user_agent = event.get("user_agent", "")
-        if "bot" in user_agent.lower() or "scanner" in user_agent.lower():
-            return True
+        self.suspicious_events.extend(suspicious)
         
-        # Check for read-only violations
-        if not event.get("read_only", True) and event.get("management_event", True):
-            # Non-read operations are potentially suspicious
-            # This is a simplified check - in production, you'd have more sophisticated rules
-            pass
+        await asyncio.gather(*(
+            _bounded(semaphore, self.handle_suspicious_event(parsed))
+            for parsed in suspicious
+        ))
         
-        return False
+        return suspicious
+    
+    def archive_history(self, events: List[Dict]):
+        """Persist suspicious events to the history table in the background."""
+        if events and settings.alert_history_table:
+            self.alert_buffer.dispatch(self.execute_tool(
+                "archive_items",
+                table_name=settings.alert_history_table,
+                item_type="suspicious_event",
+                items=events,
+                key_field="event_id"
+            ))
+    
+    def is_suspicious(self, event: Dict) -> bool:
+        """Determine if an event is suspicious."""
+        return _flag_suspicious(event)
     
     async def handle_suspicious_event(self, event: Dict):
         """Handle a detected suspicious event."""
         try:
             event_name = event.get("event_name", "Unknown")
-            user_identity = event.get("user_identity", {})
-            source_ip = event.get("source_ip", "Unknown")
-            event_time = event.get("event_time", "Unknown")
-            
-            message = f"""
-Suspicious CloudTrail Event Detected
-
-Event: {event_name}
-Time: {event_time}
-User: {user_identity.get('arn', 'Unknown')}
-Source IP: {source_ip}
-Region: {event.get('aws_region', 'Unknown')}
-
-Please review this event immediately.
-"""
+            user_arn = event.get("user_identity", {}).get("arn", "Unknown")
             
-            # Send alerts
-            await self.execute_tool(
-                "send_sns_notification",
-                subject=f"Suspicious AWS Activity: {event_name}",
-                message=message
+            message = _SUSPICIOUS_TMPL.format_map(
+                ChainMap({"user_arn": user_arn}, event, _SUSPICIOUS_DEFAULTS)
             )
             
-            await self.execute_tool(
-                "send_slack_alert",
-                message=message,
-                severity="warning"
-            )
-            
-            print(f"[{self.name}] Alert sent for suspicious event: {event_name}")
+            # Queue alert for the next digest
+            await self.alert_buffer.enqueue({
+                "subject": f"Suspicious AWS Activity: {event_name}",
+                "message": message,
+                "severity": "warning"
+            })
             
+            logger.debug("[%s] Alert queued for suspicious event: %s", self.name, event_name)
+        
         except Exception as e:
-            print(f"[{self.name}] Error handling suspicious event: {e}")
+            logger.error("[%s] Error handling suspicious event: %s", self.name, e)
+    
+    async def deliver_alerts(self, alerts: List[Dict]):
+        """Send a batch of buffered alerts as a single SNS/Slack digest."""
+        digest = build_digest(alerts, "Suspicious AWS Activity")
+        
+        # Fire and forget: SNS and Slack are sent concurrently off the detection path
+        self.alert_buffer.dispatch(self.execute_tool(
+            "send_sns_notification",
+            subject=digest["subject"],
+            message=digest["message"]
+        ))
+        
+        self.alert_buffer.dispatch(self.execute_tool(
+            "send_slack_alert",
+            message=digest["message"],
+            severity=digest["severity"]
+        ))
+        
+        logger.info("[%s] Alert digest dispatched for %s suspicious events", self.name, len(alerts))
     
     async def handle_insight_anomaly(self, insights: Dict):
         """Handle CloudTrail Insights anomaly detection."""
@@ -192,26 +356,28 @@ Anomalies Detected: {insights.get('anomalies_detected', 0)}
 
 Please review the CloudTrail logs for this period.
 """
-            
-            await self.execute_tool(
+
+            self.alert_buffer.dispatch(self.execute_tool(
                 "send_sns_notification",
                 subject="CloudTrail Insights: Unusual Activity Detected",
                 message=message
-            )
+            ))
             
-            await self.execute_tool(
+            self.alert_buffer.dispatch(self.execute_tool(
                 "send_slack_alert",
                 message=message,
                 severity="warning"
-            )
-            
+            ))
+        
         except Exception as e:
-            print(f"[{self.name}] Error handling insight anomaly: {e}")
+            logger.error("[%s] Error handling insight anomaly: %s", self.name, e)
     
     def stop(self):
-        """Stop the continuous monitoring."""
+        """Stop the continuous monitoring by cancelling its loop."""
         self.running = False
-        print(f"[{self.name}] Stopping monitoring...")
+        if self._loop_task:
+            self._loop_task.cancel()
+        logger.info("[%s] Stopping monitoring...", self.name)
     
     def get_status(self) -> Dict:
         """Get current agent status."""
@@ -220,5 +386,6 @@ Please review the CloudTrail logs for this period.
             "running": self.running,
             "last_check_time": self.last_check_time.isoformat() if self.last_check_time else None,
             "suspicious_events_count": len(self.suspicious_events),
-            "check_interval_seconds": settings.cloudtrail_check_interval_seconds
+            "check_interval_seconds": settings.cloudtrail_check_interval_seconds,
+            "tool_call_counts": dict(self.tool_call_counts)
         }
@@ -1,7 +1,9 @@
 """Cost Anomaly Detection Agent for continuous spending monitoring."""
+from collections import ChainMap, deque
 from datetime import datetime, timedelta
 from typing import Dict, List
 import asyncio
+import logging
 from strands_agents import Agent, Tool
 from tools.cost_tools import (
     get_cost_anomalies,
@@ -9,8 +11,47 @@ from tools.cost_tools import (
     analyze_cost_anomaly
 )
 from tools.alerting_tools import send_sns_notification, send_slack_alert
+from tools.storage_tools import archive_items
+from utils.alert_buffer import AlertBuffer, build_digest
 from config import settings
 
+logger = logging.getLogger(__name__)
+
+# Most recent anomalies kept in memory; older ones live in the history table
+RECENT_ANOMALIES_SIZE = 10_000
+
+# Tools that call quota-bound AWS APIs and are rate limited per agent
+RATE_LIMITED_TOOLS = (
+    "get_cost_anomalies",
+    "configure_cost_monitor",
+    "analyze_cost_anomaly",
+    "send_sns_notification"
+)
+
+# Alert body for cost anomalies, filled with str.format_map per alert
+_COST_ANOMALY_TMPL = """
+Cost Anomaly Detected
+
+Anomaly ID: {anomaly_id}
+Dimension: {dimension_value}
+Total Impact: ${total_impact}
+Status: {status}
+
+Root Causes:
+{root_causes}
+
+Recommendations:
+{recommendations}
+
+Please review and take appropriate action.
+"""
+
+# Fallback values for fields missing from an anomaly
+_COST_ANOMALY_DEFAULTS = {
+    "dimension_value": "Unknown",
+    "status": "Unknown"
+}
+
 
 class CostAnomalyDetectionAgent(Agent):
     """
@@ -27,13 +68,20 @@ class CostAnomalyDetectionAgent(Agent):
                 Tool(configure_cost_monitor),
                 Tool(analyze_cost_anomaly),
                 Tool(send_sns_notification),
-                Tool(send_slack_alert)
+                Tool(send_slack_alert),
+                Tool(archive_items)
             ]
         )
         self.last_check_time = None
         self.running = False
-        self.detected_anomalies = []
+        self._loop_task = None  # task running monitor_continuously, cancelled by stop()
+        self.detected_anomalies = deque(maxlen=RECENT_ANOMALIES_SIZE)
+        self._seen_anomaly_ids = set()
         self.monitors_configured = False
+        self.alert_buffer = AlertBuffer(self.deliver_alerts)
+        
+        for tool_name in RATE_LIMITED_TOOLS:
+            self.limit_tool_rate(tool_name, settings.tool_rate_limit_per_second, settings.tool_rate_limit_burst)
     
     async def initialize_monitors(self):
         """Initialize cost anomaly detection monitors."""
@@ -41,7 +89,7 @@ class CostAnomalyDetectionAgent(Agent):
             return
         
         try:
-            print(f"[{self.name}] Initializing cost anomaly monitors...")
+            logger.info("[%s] Initializing cost anomaly monitors...", self.name)
             
             # Configure monitors for different dimensions
             monitor_types = [
@@ -58,41 +106,55 @@ class CostAnomalyDetectionAgent(Agent):
                 )
                 
                 if monitor_arn:
-                    print(f"[{self.name}] Configured {monitor_type} monitor: {monitor_arn}")
+                    logger.info("[%s] Configured %s monitor: %s", self.name, monitor_type, monitor_arn)
             
             self.monitors_configured = True
+            self.notify_state_change()
             
         except Exception as e:
-            print(f"[{self.name}] Error initializing monitors: {e}")
+            logger.error("[%s] Error initializing monitors: %s", self.name, e)
     
     async def monitor_continuously(self):
         """Main continuous monitoring loop."""
         self.running = True
+        self._loop_task = asyncio.current_task()
+        self.notify_state_change()
+        self.alert_buffer.start()
         
-        # Initialize monitors on startup
-        if settings.cost_anomaly_detection_enabled:
-            await self.initialize_monitors()
-        
-        print(f"[{self.name}] Starting continuous cost monitoring...")
-        
-        while self.running:
-            try:
-                await self.check_cost_anomalies()
-                await asyncio.sleep(settings.cost_check_interval_seconds)
-            except Exception as e:
-                print(f"[{self.name}] Error in monitoring loop: {e}")
-                await asyncio.sleep(3600)  # Wait 1 hour before retrying
+        # Runs until the task is cancelled (see stop())
+        try:
+            # Initialize monitors on startup
+            if settings.cost_anomaly_detection_enabled:
+                await self.initialize_monitors()
+            
+            logger.info("[%s] Starting continuous cost monitoring...", self.name)
+            
+            while True:
+                try:
+                    processed = await self.check_cost_anomalies()
+                    
+                    # Re-poll immediately while new anomalies keep arriving; sleep only when idle
+                    if processed == 0:
+                        await asyncio.sleep(settings.cost_check_interval_seconds)
+                except Exception as e:
+                    logger.error("[%s] Error in monitoring loop: %s", self.name, e)
+                    await asyncio.sleep(3600)  # Wait 1 hour before retrying
+        finally:
+            self.running = False
+            self._loop_task = None
+            self.notify_state_change()
+            await self.alert_buffer.stop()
     
-    async def check_cost_anomalies(self):
-        """Check for cost anomalies."""
+    async def check_cost_anomalies(self) -> int:
+        """Check for cost anomalies. Returns the number of new anomalies processed."""
         try:
             if not settings.cost_anomaly_detection_enabled:
-                return
+                return 0
             
             end_date = datetime.now().strftime('%Y-%m-%d')
             start_date = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
             
-            print(f"[{self.name}] Checking cost anomalies from {start_date} to {end_date}")
+            logger.info("[%s] Checking cost anomalies from %s to %s", self.name, start_date, end_date)
             
             # Get anomalies
             anomalies = await self.execute_tool(
@@ -102,11 +164,12 @@ class CostAnomalyDetectionAgent(Agent):
             )
             
             if not anomalies:
-                print(f"[{self.name}] No cost anomalies detected")
+                logger.info("[%s] No cost anomalies detected", self.name)
                 self.last_check_time = datetime.now()
-                return
+                self.notify_state_change()
+                return 0
             
-            print(f"[{self.name}] Found {len(anomalies)} cost anomalies")
+            logger.info("[%s] Found %s cost anomalies", self.name, len(anomalies))
             
             # Process each anomaly
             new_anomalies = []
@@ -114,7 +177,8 @@ class CostAnomalyDetectionAgent(Agent):
                 anomaly_id = anomaly.get("anomaly_id", "")
                 
                 # Check if we've already processed this anomaly
-                if not any(a.get("anomaly_id") == anomaly_id for a in self.detected_anomalies):
+                if anomaly_id not in self._seen_anomaly_ids:
+                    self._seen_anomaly_ids.add(anomaly_id)
                     new_anomalies.append(anomaly)
                     self.detected_anomalies.append(anomaly)
                     
@@ -122,12 +186,16 @@ class CostAnomalyDetectionAgent(Agent):
                     await self.handle_cost_anomaly(anomaly)
             
             self.last_check_time = datetime.now()
+            self.notify_state_change()
+            self.archive_history(new_anomalies)
             
             if new_anomalies:
-                print(f"[{self.name}] Processed {len(new_anomalies)} new anomalies")
+                logger.info("[%s] Processed %s new anomalies", self.name, len(new_anomalies))
+            
+            return len(new_anomalies)
             
         except Exception as e:
-            print(f"[{self.name}] Error checking cost anomalies: {e}")
+            logger.error("[%s] Error checking cost anomalies: %s", self.name, e)
             raise
     
     async def handle_cost_anomaly(self, anomaly: Dict):
@@ -136,7 +204,6 @@ class CostAnomalyDetectionAgent(Agent):
             anomaly_id = anomaly.get("anomaly_id", "")
             impact = anomaly.get("impact", {})
             root_causes = anomaly.get("root_cause", [])
-            dimension_value = anomaly.get("dimension_value", "Unknown")
             
             # Get detailed analysis
             analysis = await self.execute_tool("analyze_cost_anomaly", anomaly_id=anomaly_id)
@@ -149,45 +216,61 @@ class CostAnomalyDetectionAgent(Agent):
             if total_impact > 10000:  # $10,000 threshold
                 severity = "critical"
             
-            message = f"""
-Cost Anomaly Detected
-
-Anomaly ID: {anomaly_id}
-Dimension: {dimension_value}
-Total Impact: ${total_impact}
-Status: {anomaly.get('status', 'Unknown')}
-
-Root Causes:
-{chr(10).join([f"- {cause}" for cause in root_causes[:3]])}
-
-Recommendations:
-{chr(10).join([f"- {rec}" for rec in analysis.get('recommendations', [])[:3]])}
-
-Please review and take appropriate action.
-"""
+            message = _COST_ANOMALY_TMPL.format_map(ChainMap({
+                "anomaly_id": anomaly_id,
+                "total_impact": total_impact,
+                "root_causes": "\n".join(f"- {cause}" for cause in root_causes[:3]),
+                "recommendations": "\n".join(f"- {rec}" for rec in analysis.get("recommendations", [])[:3])
+            }, anomaly, _COST_ANOMALY_DEFAULTS))
             
-            # Send alerts
-            await self.execute_tool(
-                "send_sns_notification",
-                subject=f"Cost Anomaly Alert: ${total_impact} Impact",
-                message=message
-            )
-            
-            await self.execute_tool(
-                "send_slack_alert",
-                message=message,
-                severity=severity
-            )
+            # Queue alert for the next digest
+            await self.alert_buffer.enqueue({
+                "subject": f"Cost Anomaly Alert: ${total_impact} Impact",
+                "message": message,
+                "severity": severity
+            })
             
-            print(f"[{self.name}] Alert sent for cost anomaly: {anomaly_id}")
+            logger.debug("[%s] Alert queued for cost anomaly: %s", self.name, anomaly_id)
             
         except Exception as e:
-            print(f"[{self.name}] Error handling cost anomaly: {e}")
+            logger.error("[%s] Error handling cost anomaly: %s", self.name, e)
+    
+    def archive_history(self, anomalies: List[Dict]):
+        """Persist anomalies to the history table in the background."""
+        if anomalies and settings.alert_history_table:
+            self.alert_buffer.dispatch(self.execute_tool(
+                "archive_items",
+                table_name=settings.alert_history_table,
+                item_type="cost_anomaly",
+                items=anomalies,
+                key_field="anomaly_id"
+            ))
+    
+    async def deliver_alerts(self, alerts: List[Dict]):
+        """Send a batch of buffered alerts as a single SNS/Slack digest."""
+        digest = build_digest(alerts, "Cost Anomaly Alerts")
+        
+        # Fire and forget: SNS and Slack are sent concurrently off the detection path
+        self.alert_buffer.dispatch(self.execute_tool(
+            "send_sns_notification",
+            subject=digest["subject"],
+            message=digest["message"]
+        ))
+        
+        self.alert_buffer.dispatch(self.execute_tool(
+            "send_slack_alert",
+            message=digest["message"],
+            severity=digest["severity"]
+        ))
+        
+        logger.info("[%s] Alert digest dispatched for %s cost anomalies", self.name, len(alerts))
     
     def stop(self):
-        """Stop the continuous monitoring."""
+        """Stop the continuous monitoring by cancelling its loop."""
         self.running = False
-        print(f"[{self.name}] Stopping cost monitoring...")
+        if self._loop_task:
+            self._loop_task.cancel()
+        logger.info("[%s] Stopping cost monitoring...", self.name)
     
     def get_status(self) -> Dict:
         """Get current agent status."""
@@ -197,5 +280,6 @@ Please review and take appropriate action.
             "last_check_time": self.last_check_time.isoformat() if self.last_check_time else None,
             "anomalies_detected_count": len(self.detected_anomalies),
             "monitors_configured": self.monitors_configured,
-            "check_interval_seconds": settings.cost_check_interval_seconds
+            "check_interval_seconds": settings.cost_check_interval_seconds,
+            "tool_call_counts": dict(self.tool_call_counts)
         }
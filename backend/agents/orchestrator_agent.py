@@ -1,12 +1,19 @@
 """Orchestrator Agent that coordinates all monitoring agents."""
+from collections import deque
 from typing import Dict, List
 import asyncio
+import logging
 from strands_agents import Agent
 from agents.cloudtrail_monitoring_agent import CloudTrailMonitoringAgent
 from agents.cost_anomaly_agent import CostAnomalyDetectionAgent
 from agents.user_analytics_agent import UserAnalyticsAgent
 from config import settings
 
+logger = logging.getLogger(__name__)
+
+# Parsed CloudTrail events kept for user analytics; the oldest are dropped when full
+EVENT_BUS_SIZE = 100_000
+
 
 class OrchestratorAgent(Agent):
     """
@@ -20,10 +27,14 @@ class OrchestratorAgent(Agent):
             description="Orchestrates all AWS monitoring agents"
         )
         
+        # Parsed events flow from the CloudTrail agent to user analytics
+        # through this ring buffer, so events are fetched only once
+        self.event_bus = deque(maxlen=EVENT_BUS_SIZE)
+        
         # Initialize specialized agents
-        self.cloudtrail_agent = CloudTrailMonitoringAgent()
+        self.cloudtrail_agent = CloudTrailMonitoringAgent(event_bus=self.event_bus)
         self.cost_agent = CostAnomalyDetectionAgent()
-        self.user_analytics_agent = UserAnalyticsAgent()
+        self.user_analytics_agent = UserAnalyticsAgent(event_bus=self.event_bus)
         
         self.agents = {
             "cloudtrail": self.cloudtrail_agent,
@@ -31,61 +42,64 @@ class OrchestratorAgent(Agent):
             "user_analytics": self.user_analytics_agent
         }
         
+        # Long-running loop of each agent, keyed like self.agents
+        self.agent_loops = {
+            "cloudtrail": self.cloudtrail_agent.monitor_continuously,
+            "cost": self.cost_agent.monitor_continuously,
+            "user_analytics": self.user_analytics_agent.analyze_continuously
+        }
+        
         self.running = False
-        self.tasks = []
+        self.tasks: Dict[str, asyncio.Task] = {}  # agent name -> task running its loop
     
     async def start_all_agents(self):
         """Start all monitoring agents."""
-        if self.running:
-            print(f"[{self.name}] Agents already running")
+        if all(agent_name in self.tasks and not self.tasks[agent_name].done() for agent_name in self.agent_loops):
+            logger.info("[%s] Agents already running", self.name)
             return
         
-        self.running = True
-        print(f"[{self.name}] Starting all monitoring agents...")
+        logger.info("[%s] Starting all monitoring agents...", self.name)
         
-        # Start CloudTrail monitoring
-        cloudtrail_task = asyncio.create_task(
-            self.cloudtrail_agent.monitor_continuously()
-        )
-        self.tasks.append(cloudtrail_task)
+        # Start CloudTrail monitoring, Cost monitoring and User Analytics
+        # (agents already started individually keep their running loop)
+        for agent_name in self.agent_loops:
+            self.start_agent(agent_name)
         
-        # Start Cost monitoring
-        cost_task = asyncio.create_task(
-            self.cost_agent.monitor_continuously()
-        )
-        self.tasks.append(cost_task)
-        
-        # Start User Analytics
-        user_analytics_task = asyncio.create_task(
-            self.user_analytics_agent.analyze_continuously()
-        )
-        self.tasks.append(user_analytics_task)
-        
-        print(f"[{self.name}] All agents started")
+        logger.info("[%s] All agents started", self.name)
     
     async def stop_all_agents(self):
         """Stop all monitoring agents."""
-        if not self.running:
-            return
-        
-        print(f"[{self.name}] Stopping all agents...")
-        
         self.running = False
         
-        # Stop individual agents
-        self.cloudtrail_agent.stop()
-        self.cost_agent.stop()
-        self.user_analytics_agent.stop()
+        # Tasks are cancelled even when the orchestrator was not started as a
+        # whole, since single agents can be started from the API
+        tasks = list(self.tasks.values())
+        self.tasks = {}
+        if not tasks:
+            return
+        
+        logger.info("[%s] Stopping all agents...", self.name)
         
-        # Cancel tasks
-        for task in self.tasks:
+        # Cancel the agent loops; each exits at its current await instead of
+        # waiting out its check interval, then flushes its pending alerts
+        for task in tasks:
             task.cancel()
         
         # Wait for tasks to complete
-        await asyncio.gather(*self.tasks, return_exceptions=True)
+        await asyncio.gather(*tasks, return_exceptions=True)
         
-        self.tasks = []
-        print(f"[{self.name}] All agents stopped")
+        logger.info("[%s] All agents stopped", self.name)
+    
+    def start_agent(self, agent_name: str) -> asyncio.Task:
+        """Start a single agent's loop as a task tracked for shutdown (a running loop is reused)."""
+        # Forget loops that already finished, e.g. agents stopped individually
+        self.tasks = {name: task for name, task in self.tasks.items() if not task.done()}
+        
+        task = self.tasks.get(agent_name)
+        if task is None:
+            task = self.tasks[agent_name] = asyncio.create_task(self.agent_loops[agent_name]())
+        self.running = True
+        return task
     
     def get_all_agent_status(self) -> Dict:
         """Get status of all agents."""
@@ -101,6 +115,33 @@ class OrchestratorAgent(Agent):
             }
         }
     
+    def snapshot(self) -> Dict:
+        """
+        Get the dashboard counters of all agents in one pass.
+        Runs synchronously on the event loop, so the counters are consistent
+        with each other without taking a lock.
+        """
+        cloudtrail = self.cloudtrail_agent
+        cost = self.cost_agent
+        user_analytics = self.user_analytics_agent
+        return {
+            "cloudtrail": {
+                "suspicious_events": len(cloudtrail.suspicious_events),
+                "running": cloudtrail.running,
+                "last_check": cloudtrail.last_check_time.isoformat() if cloudtrail.last_check_time else None
+            },
+            "cost": {
+                "anomalies": len(cost.detected_anomalies),
+                "running": cost.running,
+                "last_check": cost.last_check_time.isoformat() if cost.last_check_time else None
+            },
+            "user_analytics": {
+                "users_tracked": len(user_analytics.user_metrics),
+                "running": user_analytics.running,
+                "last_analysis": user_analytics.last_analysis_time.isoformat() if user_analytics.last_analysis_time else None
+            }
+        }
+    
     def get_agent(self, agent_name: str):
         """Get a specific agent by name."""
         return self.agents.get(agent_name)
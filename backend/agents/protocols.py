@@ -0,0 +1,49 @@
+"""Interfaces the API relies on when reading agent state."""
+from datetime import datetime
+from typing import Dict, List, Optional, Protocol, Sequence, runtime_checkable
+
+
+@runtime_checkable
+class MonitoringAgent(Protocol):
+    """State and controls shared by every agent."""
+    
+    name: str
+    running: bool
+    
+    def get_status(self) -> Dict: ...
+    
+    def stop(self): ...
+
+
+@runtime_checkable
+class CloudTrailMonitor(MonitoringAgent, Protocol):
+    """Agent exposing recent suspicious CloudTrail events."""
+    
+    suspicious_events: Sequence[Dict]
+    last_check_time: Optional[datetime]
+
+
+@runtime_checkable
+class CostMonitor(MonitoringAgent, Protocol):
+    """Agent exposing recent cost anomalies."""
+    
+    detected_anomalies: Sequence[Dict]
+    last_check_time: Optional[datetime]
+
+
+@runtime_checkable
+class UserAnalytics(MonitoringAgent, Protocol):
+    """Agent exposing per-user usage, cost and summaries."""
+    
+    user_metrics: Dict[str, Dict]
+    user_costs: Dict[str, Dict]
+    user_summaries: Dict[str, Dict]
+    last_analysis_time: Optional[datetime]
+    
+    def get_top_users_by_usage(self, limit: int = 10) -> List[Dict]: ...
+    
+    def get_top_users_by_cost(self, limit: int = 10) -> List[Dict]: ...
+    
+    def get_inactive_users(self, days_threshold: int = 30) -> List[Dict]: ...
+    
+    async def process_events_for_analytics(self, events: List[Dict], *, replace: bool = False): ...
@@ -1,15 +1,57 @@
 """User Analytics Agent for person-level tracking and cost attribution."""
-from datetime import datetime, timedelta
-from typing import Dict, List
+from datetime import datetime, timezone
+from collections import OrderedDict
+from typing import Deque, Dict, List, Optional, Tuple
 import asyncio
+import logging
+import hashlib
+import time
+import numpy as np
 from strands_agents import Agent, Tool
 from tools.user_analytics_tools import (
     aggregate_usage_by_user,
+    aggregate_usage_columnar,
     attribute_costs_to_users,
-    get_user_usage_summary
+    get_user_usage_summary,
+    merge_usage_metrics,
+    merge_usage_summaries
 )
 from config import settings
 
+logger = logging.getLogger(__name__)
+
+
+# Upper bound on concurrent per-user summary tool calls
+MAX_CONCURRENT_SUMMARIES = 32
+
+# Maximum number of (user, event batch) summaries kept in the LRU cache
+SUMMARY_CACHE_SIZE = 10_000
+
+# Distinct limits remembered per top-users ranking before the cache is reset
+TOP_USERS_CACHE_SIZE = 8
+
+
+def _events_fingerprint(events: List[Dict]) -> Optional[bytes]:
+    """Fingerprint an event batch by its event IDs, or None if any event lacks one."""
+    digest = hashlib.blake2b(digest_size=8)
+    for event in events:
+        event_id = event.get("event_id")
+        if not event_id:
+            return None
+        digest.update(event_id.encode())
+        digest.update(b"\0")
+    return digest.digest()
+
+
+def _parse_epoch(timestamp: Optional[str]) -> Optional[float]:
+    """Convert an ISO-8601 timestamp to epoch seconds, or None if unparseable."""
+    if not timestamp:
+        return None
+    try:
+        return datetime.fromisoformat(timestamp.replace("Z", "+00:00")).timestamp()
+    except (TypeError, ValueError):
+        return None
+
 
 class UserAnalyticsAgent(Agent):
     """
@@ -17,7 +59,7 @@ class UserAnalyticsAgent(Agent):
     Provides person-level insights: who is using AWS, how much, and what they cost.
     """
     
-    def __init__(self):
+    def __init__(self, event_bus: Optional[Deque[Dict]] = None):
         super().__init__(
             name="UserAnalyticsAgent",
             description="Tracks individual user usage and cost attribution at person level",
@@ -29,87 +71,144 @@ class UserAnalyticsAgent(Agent):
         )
         self.last_analysis_time = None
         self.running = False
+        self._loop_task = None  # task running analyze_continuously, cancelled by stop()
         self.user_metrics = {}  # user_name -> metrics
         self.user_costs = {}  # user_name -> cost data
         self.user_summaries = {}  # user_name -> summary
+        self.event_bus = event_bus  # parsed events published by CloudTrailMonitoringAgent
+        self._user_names = []  # user names aligned with _last_seen_epoch
+        self._last_seen_epoch = np.empty(0, dtype=np.float64)  # last_seen as epoch seconds
+        self._last_seen_source = None  # user_metrics dict the epochs were built from
+        self._summary_cache: "OrderedDict[Tuple[str, bytes], Dict]" = OrderedDict()  # LRU of summaries
+        self._top_users_cache: Dict[str, Tuple] = {}  # score field -> (source dict, names, scores, limit -> top users)
     
     async def analyze_continuously(self):
         """Main continuous analysis loop."""
         self.running = True
-        print(f"[{self.name}] Starting continuous user analytics...")
+        self._loop_task = asyncio.current_task()
+        self.notify_state_change()
+        logger.info("[%s] Starting continuous user analytics...", self.name)
         
-        while self.running:
-            try:
-                await self.analyze_user_activity()
-                await asyncio.sleep(settings.monitoring_interval_seconds)
-            except Exception as e:
-                print(f"[{self.name}] Error in analysis loop: {e}")
-                await asyncio.sleep(300)  # Wait 5 minutes before retrying
+        # Runs until the task is cancelled (see stop())
+        try:
+            while True:
+                try:
+                    await self.analyze_user_activity()
+                    await asyncio.sleep(settings.monitoring_interval_seconds)
+                except Exception as e:
+                    logger.error("[%s] Error in analysis loop: %s", self.name, e)
+                    await asyncio.sleep(300)  # Wait 5 minutes before retrying
+        finally:
+            self.running = False
+            self._loop_task = None
+            self.notify_state_change()
     
     async def analyze_user_activity(self):
         """Analyze user activity from CloudTrail events."""
         try:
-            # Get events from CloudTrail agent
-            # In a real implementation, this would fetch from the CloudTrail agent
-            # For now, we'll use the events stored in the agent
+            logger.info("[%s] Analyzing user activity...", self.name)
             
-            print(f"[{self.name}] Analyzing user activity...")
-            
-            # This would typically get events from CloudTrail agent
-            # For now, we'll process any events we have access to
-            # In production, you'd integrate with the CloudTrail agent's data
-            
-            end_time = datetime.utcnow()
-            if self.last_analysis_time:
-                start_time = self.last_analysis_time
-            else:
-                start_time = end_time - timedelta(days=30)
+            end_time = datetime.now(timezone.utc)
             
-            # Note: In production, fetch events from CloudTrail agent or database
-            # For now, this is a placeholder that shows the structure
+            # Drain the events the CloudTrail agent parsed since the last analysis
+            if self.event_bus:
+                events = list(self.event_bus)
+                self.event_bus.clear()
+                await self.process_events_for_analytics(events)
             
             self.last_analysis_time = end_time
-            print(f"[{self.name}] User analysis complete")
-            
+            self.notify_state_change()
+            logger.info("[%s] User analysis complete", self.name)
+        
         except Exception as e:
-            print(f"[{self.name}] Error analyzing user activity: {e}")
+            logger.error("[%s] Error analyzing user activity: %s", self.name, e)
             raise
     
-    async def process_events_for_analytics(self, events: List[Dict]):
-        """Process CloudTrail events to generate user analytics."""
+    async def process_events_for_analytics(
+        self,
+        events: List[Dict],
+        columns: Optional[Dict[str, np.ndarray]] = None,
+        replace: bool = False
+    ):
+        """
+        Process CloudTrail events to generate user analytics.
+        
+        Args:
+            events: Parsed CloudTrail events not yet analyzed
+            columns: events_to_columns(events), if already built
+            replace: Replace the accumulated metrics and summaries instead of
+                merging this batch into them (for re-analyzing a full snapshot)
+        """
         try:
-            print(f"[{self.name}] Processing {len(events)} events for user analytics...")
+            logger.info("[%s] Processing %s events for user analytics...", self.name, len(events))
             
-            # Aggregate usage by user
-            usage_metrics = await self.execute_tool(
-                "aggregate_usage_by_user",
-                events=events
-            )
+            # Aggregate usage by user. The aggregation is a single local pass, so
+            # by default it is called directly rather than through execute_tool
+            if columns is not None:
+                usage_metrics = aggregate_usage_columnar(columns)
+            elif settings.inline_usage_aggregation:
+                usage_metrics = aggregate_usage_by_user(events)
+            else:
+                usage_metrics = await self.execute_tool(
+                    "aggregate_usage_by_user",
+                    events=events
+                )
             
-            self.user_metrics = usage_metrics
+            logger.info("[%s] Analyzed %s users", self.name, len(usage_metrics))
             
-            print(f"[{self.name}] Analyzed {len(usage_metrics)} users")
+            # Generate summaries for all users concurrently, reusing cached
+            # summaries when the same event batch was already summarized
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT_SUMMARIES)
+            events_fp = _events_fingerprint(events)
             
-            # Generate summaries for each user
-            for user_name in usage_metrics.keys():
-                summary = await self.execute_tool(
-                    "get_user_usage_summary",
-                    user_name=user_name,
-                    events=events,
-                    days=30
-                )
-                self.user_summaries[user_name] = summary
+            async def summarize(user_name: str):
+                key = (user_name, events_fp)
+                if events_fp is not None and key in self._summary_cache:
+                    self._summary_cache.move_to_end(key)
+                    return user_name, self._summary_cache[key]
+                
+                async with semaphore:
+                    summary = await self.execute_tool(
+                        "get_user_usage_summary",
+                        user_name=user_name,
+                        events=events,
+                        days=30
+                    )
+                
+                if events_fp is not None:
+                    self._cache_summary(key, summary)
+                return user_name, summary
             
-            return usage_metrics
+            results = await asyncio.gather(*(summarize(user_name) for user_name in usage_metrics))
+            
+            # Each batch holds only the events since the last analysis, so its
+            # metrics and summaries are folded into the running ones (or into
+            # nothing when replacing). Both are assigned together, with no await
+            # in between, so readers never see one updated without the other;
+            # the new metrics dict also invalidates the cached top-users rankings
+            running_metrics = {} if replace else self.user_metrics
+            running_summaries = {} if replace else self.user_summaries
+            self.user_metrics = merge_usage_metrics(running_metrics, usage_metrics)
+            self.user_summaries = merge_usage_summaries(running_summaries, dict(results))
+            self._index_last_seen()
+            self.notify_state_change()
             
+            return usage_metrics
+        
         except Exception as e:
-            print(f"[{self.name}] Error processing events: {e}")
+            logger.error("[%s] Error processing events: %s", self.name, e)
             raise
     
+    def _cache_summary(self, key: Tuple[str, bytes], summary: Dict):
+        """Store a summary in the LRU cache, evicting the oldest entries."""
+        self._summary_cache[key] = summary
+        while len(self._summary_cache) > SUMMARY_CACHE_SIZE:
+            self._summary_cache.popitem(last=False)
+    
     async def process_costs_for_attribution(self, cost_data: List[Dict], events: List[Dict]):
         """Process cost data to attribute costs to users."""
         try:
-            print(f"[{self.name}] Attributing costs to users...")
+            logger.info("[%s] Attributing costs to users...", self.name)
             
             # Attribute costs to users
             cost_attribution = await self.execute_tool(
@@ -119,79 +218,107 @@ class UserAnalyticsAgent(Agent):
             )
             
             self.user_costs = cost_attribution
+            self.notify_state_change()
             
-            print(f"[{self.name}] Attributed costs to {len(cost_attribution)} users")
+            logger.info("[%s] Attributed costs to %s users", self.name, len(cost_attribution))
             
             return cost_attribution
-            
+        
         except Exception as e:
-            print(f"[{self.name}] Error attributing costs: {e}")
+            logger.error("[%s] Error attributing costs: %s", self.name, e)
             raise
     
     def get_top_users_by_usage(self, limit: int = 10) -> List[Dict]:
         """Get top users by activity/usage."""
-        if not self.user_metrics:
-            return []
-        
-        sorted_users = sorted(
-            self.user_metrics.items(),
-            key=lambda x: x[1].get("activity_score", 0),
-            reverse=True
-        )
-        
-        return [
-            {
-                "user_name": user_name,
-                **metrics
-            }
-            for user_name, metrics in sorted_users[:limit]
-        ]
+        return self._top_users(self.user_metrics, "activity_score", limit)
     
     def get_top_users_by_cost(self, limit: int = 10) -> List[Dict]:
         """Get top users by cost."""
-        if not self.user_costs:
+        return self._top_users(self.user_costs, "total_cost", limit)
+    
+    def _top_users(self, source: Dict[str, Dict], score_field: str, limit: int) -> List[Dict]:
+        """
+        Rank users in source by score_field, highest first. Scores are indexed
+        into an array once per source dict, and rankings are reused until the
+        dict is replaced by a new analysis or injected data.
+        """
+        if not source or limit <= 0:
             return []
         
-        sorted_users = sorted(
-            self.user_costs.items(),
-            key=lambda x: x[1].get("total_cost", 0),
-            reverse=True
-        )
+        cached_source, user_names, scores, cache = self._top_users_cache.get(score_field, (None, None, None, None))
+        if cached_source is not source:
+            user_names = list(source)
+            scores = np.fromiter(
+                (values.get(score_field, 0) for values in source.values()),
+                dtype=np.float64,
+                count=len(source)
+            )
+            cache = {}
+            self._top_users_cache[score_field] = (source, user_names, scores, cache)
+        
+        top = cache.get(limit)
+        if top is None:
+            if len(cache) >= TOP_USERS_CACHE_SIZE:
+                cache.clear()
+            
+            # Select the top limit in O(n), then sort only those
+            if limit < len(scores):
+                idxs = np.argpartition(-scores, limit - 1)[:limit]
+            else:
+                idxs = np.arange(len(scores))
+            idxs = idxs[np.argsort(-scores[idxs], kind="stable")]
+            
+            top = cache[limit] = [
+                {
+                    "user_name": user_names[i],
+                    **source[user_names[i]]
+                }
+                for i in idxs
+            ]
+        
+        return top
+    
+    def get_inactive_users(self, days_threshold: int = 30) -> List[Dict]:
+        """Get users who haven't been active recently."""
+        if self._last_seen_source is not self.user_metrics:
+            self._index_last_seen()
+        
+        days_inactive = ((time.time() - self._last_seen_epoch) // 86400).astype(np.int64)
+        idxs = np.nonzero(days_inactive >= days_threshold)[0]
+        
+        # Most inactive first
+        idxs = idxs[np.argsort(-days_inactive[idxs], kind="stable")]
         
         return [
             {
-                "user_name": user_name,
-                **costs
+                "user_name": self._user_names[i],
+                "days_inactive": int(days_inactive[i]),
+                **self.user_metrics[self._user_names[i]]
             }
-            for user_name, costs in sorted_users[:limit]
+            for i in idxs
         ]
     
-    def get_inactive_users(self, days_threshold: int = 30) -> List[Dict]:
-        """Get users who haven't been active recently."""
-        inactive = []
+    def _index_last_seen(self):
+        """Parse each user's last_seen timestamp once into an epoch-seconds array."""
+        user_names = []
+        epochs = []
         
         for user_name, metrics in self.user_metrics.items():
-            last_seen_str = metrics.get("last_seen")
-            if last_seen_str:
-                try:
-                    last_seen = datetime.fromisoformat(last_seen_str.replace("Z", "+00:00"))
-                    days_inactive = (datetime.now(last_seen.tzinfo) - last_seen).days
-                    
-                    if days_inactive >= days_threshold:
-                        inactive.append({
-                            "user_name": user_name,
-                            "days_inactive": days_inactive,
-                            **metrics
-                        })
-                except:
-                    pass
+            last_seen = _parse_epoch(metrics.get("last_seen"))
+            if last_seen is not None:
+                user_names.append(user_name)
+                epochs.append(last_seen)
         
-        return sorted(inactive, key=lambda x: x.get("days_inactive", 0), reverse=True)
+        self._user_names = user_names
+        self._last_seen_epoch = np.fromiter(epochs, dtype=np.float64, count=len(epochs))
+        self._last_seen_source = self.user_metrics
     
     def stop(self):
-        """Stop the continuous analysis."""
+        """Stop the continuous analysis by cancelling its loop."""
         self.running = False
-        print(f"[{self.name}] Stopping user analytics...")
+        if self._loop_task:
+            self._loop_task.cancel()
+        logger.info("[%s] Stopping user analytics...", self.name)
     
     def get_status(self) -> Dict:
         """Get current agent status."""
@@ -201,5 +328,6 @@ class UserAnalyticsAgent(Agent):
             "last_analysis_time": self.last_analysis_time.isoformat() if self.last_analysis_time else None,
             "users_tracked": len(self.user_metrics),
             "users_with_costs": len(self.user_costs),
-            "analysis_interval_seconds": settings.monitoring_interval_seconds
+            "analysis_interval_seconds": settings.monitoring_interval_seconds,
+            "tool_call_counts": dict(self.tool_call_counts)
         }
@@ -1,14 +1,20 @@
 """FastAPI application for AWS Track Agent."""
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+from pydantic import BaseModel, TypeAdapter, ValidationError
 from typing import List, Optional, Dict
 from datetime import datetime
+from itertools import islice
+import orjson
 import uvicorn
 import asyncio
+import importlib.util
+import logging
 import sys
 import os
+import time
 
 # Add parent directory to path
 backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -24,47 +30,152 @@ except ImportError:
     sys.modules['strands_agents'] = strands_agents_stub
 
 from agents.orchestrator_agent import OrchestratorAgent
+from agents.protocols import CloudTrailMonitor, CostMonitor, UserAnalytics
 from config import settings
+from tools.alerting_tools import close_slack_session
+from utils.logging_setup import setup_logging
 
-app = FastAPI(title="AWS Track Agent API", version="1.0.0")
+setup_logging(logging.DEBUG if settings.api_debug else logging.INFO)
 
-# CORS middleware
+
+
+# orjson options shared by every JSON response
+ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY
+
+
+class APIJSONResponse(ORJSONResponse):
+    """ORJSONResponse that also accepts naive datetimes (as UTC) and numpy values."""
+    
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+app = FastAPI(title="AWS Track Agent API", version="1.0.0", default_response_class=APIJSONResponse)
+
+# CORS middleware; explicit allowlists let preflights be answered without
+# echoing the requested methods and headers back
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[settings.frontend_url, "http://localhost:3000"],
+    allow_origin_regex=settings.frontend_origin_regex,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Authorization"],
 )
 
-# Global orchestrator instance
-orchestrator = OrchestratorAgent()
 
-# Set orchestrator for test endpoints and include router
-if settings.test_mode or settings.use_sample_data:
-    from api.test_endpoints import set_orchestrator, router as test_router
-    set_orchestrator(orchestrator)
-    app.include_router(test_router)
+@app.exception_handler(Exception)
+async def unhandled_exception_handler(request: Request, exc: Exception):
+    """Report unhandled endpoint errors as a 500 with the error message (Starlette still logs them)."""
+    return APIJSONResponse({"detail": str(exc)}, status_code=500)
 
 
-# Pydantic models
-class AgentStatusResponse(BaseModel):
-    name: str
-    running: bool
-    last_check_time: Optional[str]
-    status: Dict
+# Global orchestrator instance, created in startup_event so importing the app
+# (e.g. in each gunicorn worker or on reload) builds no agents or AWS clients
+orchestrator: Optional[OrchestratorAgent] = None
 
+# Interface each orchestrator agent must implement, keyed by agent name
+AGENT_PROTOCOLS = {
+    "cloudtrail": CloudTrailMonitor,
+    "cost": CostMonitor,
+    "user_analytics": UserAnalytics
+}
+
+
+def _check_agent_protocols(orchestrator: OrchestratorAgent):
+    """
+    Check once that each agent exposes the state the endpoints read, so the
+    endpoints can use it directly.
+    """
+    if orchestrator.agents.keys() != AGENT_PROTOCOLS.keys():
+        raise RuntimeError(f"Unexpected agents: {sorted(orchestrator.agents)}")
+    for agent_name, protocol in AGENT_PROTOCOLS.items():
+        if not isinstance(orchestrator.get_agent(agent_name), protocol):
+            raise RuntimeError(f"Agent '{agent_name}' does not implement {protocol.__name__}")
+
+
+# Start/stop responses, encoded once per known agent
+_MSG_STARTED = {name: orjson.dumps({"message": f"Agent '{name}' started"}) for name in AGENT_PROTOCOLS}
+_MSG_ALREADY_RUNNING = {name: orjson.dumps({"message": f"Agent '{name}' is already running"}) for name in AGENT_PROTOCOLS}
+_MSG_STOPPED = {name: orjson.dumps({"message": f"Agent '{name}' stopped"}) for name in AGENT_PROTOCOLS}
+_MSG_ALL_STARTED = orjson.dumps({"message": "All agents started"})
+_MSG_ALL_STOPPED = orjson.dumps({"message": "All agents stopped"})
+
+
+def _message_response(encoded: bytes) -> Response:
+    """Wrap a pre-encoded message in a JSON response."""
+    return Response(content=encoded, media_type="application/json")
+
+# Dashboards poll the stats endpoint every few seconds; recompute at most once per TTL
+DASHBOARD_STATS_TTL_SECONDS = 1.0
+DASHBOARD_STATS_HEADERS = {"Cache-Control": "public, max-age=1, stale-while-revalidate=5"}
+_dashboard_stats_cache = (0.0, None)  # (monotonic time computed, stats)
+
+# Encoded get_all_agent_status(), reused until an agent reports a state change
+_status_version = 0
+_status_cache = (-1, b"")  # (status version, JSON bytes)
+
+# Response timestamps are refreshed by a background ticker instead of being
+# formatted per request; health and stats only need them to be roughly current
+NOW_ISO_REFRESH_SECONDS = 0.2
+_now_iso = datetime.utcnow().isoformat()
+_now_iso_bytes = _now_iso.encode()
+_ticker_task: Optional[asyncio.Task] = None
+
+
+async def _ticker():
+    """Refresh the shared response timestamp until cancelled."""
+    global _now_iso, _now_iso_bytes
+    while True:
+        await asyncio.sleep(NOW_ISO_REFRESH_SECONDS)
+        _now_iso = datetime.utcnow().isoformat()
+        _now_iso_bytes = _now_iso.encode()
+
+
+def _bump_status_version():
+    """Invalidate the cached agent status."""
+    global _status_version
+    _status_version += 1
+
+
+def _agent_status_json() -> bytes:
+    """Return get_all_agent_status() as JSON bytes, re-encoding only after a state change."""
+    global _status_cache
+    version, encoded = _status_cache
+    if version != _status_version:
+        encoded = orjson.dumps(orchestrator.get_all_agent_status(), option=ORJSON_OPTIONS)
+        _status_cache = (_status_version, encoded)
+    return encoded
+
+
+def _tail(items, limit: int) -> List:
+    """Return the last limit items of a list or deque, oldest first, in O(limit)."""
+    return list(islice(reversed(items), max(0, limit)))[::-1]
 
-class HealthResponse(BaseModel):
-    status: str
-    timestamp: str
-    agents: Dict
 
+def _invalidate_dashboard_stats():
+    """Drop cached dashboard stats after an agent state change."""
+    global _dashboard_stats_cache
+    _dashboard_stats_cache = (0.0, None)
 
+
+# Pydantic models
 class StartMonitoringRequest(BaseModel):
     agent_name: Optional[str] = None  # None means start all
 
 
+# Built once; validates the raw JSON body in a single pass
+_monitoring_request_adapter = TypeAdapter(StartMonitoringRequest)
+
+
+async def parse_monitoring_request(request: Request) -> StartMonitoringRequest:
+    """Validate a start/stop request body, reporting errors as FastAPI's usual 422."""
+    try:
+        return _monitoring_request_adapter.validate_json(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
+
 class AlertResponse(BaseModel):
     id: str
     type: str
@@ -78,7 +189,32 @@ class AlertResponse(BaseModel):
 async def startup_event():
     """Start all agents on application startup."""
     print("Starting AWS Track Agent...")
+    
+    global orchestrator
+    orchestrator = OrchestratorAgent()
+    _check_agent_protocols(orchestrator)
+    app.state.orchestrator = orchestrator
+    
+    # Set orchestrator for test endpoints and include router
+    if settings.test_mode or settings.use_sample_data:
+        from api.test_endpoints import set_orchestrator, router as test_router
+        set_orchestrator(orchestrator)
+        app.include_router(test_router)
+    
+    # Run new tasks eagerly so request handlers and agent start-up code that
+    # complete without suspending skip a trip through the scheduler (Python 3.12+)
+    if hasattr(asyncio, "eager_task_factory"):
+        asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
+    
+    # Agents invalidate the cached status whenever their get_status() output changes
+    for agent in orchestrator.agents.values():
+        agent.on_state_change = _bump_status_version
+    
+    global _ticker_task
+    _ticker_task = asyncio.create_task(_ticker())
+    
     await orchestrator.start_all_agents()
+    _bump_status_version()
     print("AWS Track Agent started successfully")
 
 
@@ -86,7 +222,12 @@ async def startup_event():
 async def shutdown_event():
     """Stop all agents on application shutdown."""
     print("Shutting down AWS Track Agent...")
-    await orchestrator.stop_all_agents()
+    if _ticker_task:
+        _ticker_task.cancel()
+    if orchestrator:
+        await orchestrator.stop_all_agents()
+    # Agents flush pending alerts while stopping, so the session closes last
+    await close_slack_session()
     print("AWS Track Agent stopped")
 
 
@@ -100,24 +241,25 @@ async def root():
     }
 
 
-@app.get("/health", response_model=HealthResponse)
+@app.get("/health")
 async def health():
     """Health check endpoint."""
-    status = orchestrator.get_all_agent_status()
-    return HealthResponse(
-        status="healthy",
-        timestamp=datetime.utcnow().isoformat(),
-        agents=status
+    # Splice the cached agent status into the envelope instead of re-encoding it
+    return Response(
+        content=b'{"status":"healthy","timestamp":"%s","agents":%s}' % (
+            _now_iso_bytes, _agent_status_json()
+        ),
+        media_type="application/json"
     )
 
 
-@app.get("/api/agents", response_model=Dict)
+@app.get("/api/agents")
 async def get_agents():
     """Get status of all agents."""
-    return orchestrator.get_all_agent_status()
+    return Response(content=_agent_status_json(), media_type="application/json")
 
 
-@app.get("/api/agents/{agent_name}", response_model=AgentStatusResponse)
+@app.get("/api/agents/{agent_name}")
 async def get_agent(agent_name: str):
     """Get status of a specific agent."""
     agent = orchestrator.get_agent(agent_name)
@@ -125,51 +267,52 @@ async def get_agent(agent_name: str):
         raise HTTPException(status_code=404, detail=f"Agent '{agent_name}' not found")
     
     status = agent.get_status()
-    return AgentStatusResponse(
-        name=status["name"],
-        running=status["running"],
-        last_check_time=status.get("last_check_time"),
-        status=status
-    )
+    return APIJSONResponse({
+        "name": status["name"],
+        "running": status["running"],
+        "last_check_time": status.get("last_check_time"),
+        "status": status
+    })
 
 
 @app.post("/api/agents/start")
-async def start_agent(request: StartMonitoringRequest):
+async def start_agent(request: StartMonitoringRequest = Depends(parse_monitoring_request)):
     """Start a specific agent or all agents."""
+    _invalidate_dashboard_stats()
+    _bump_status_version()
     if request.agent_name:
         agent = orchestrator.get_agent(request.agent_name)
         if not agent:
             raise HTTPException(status_code=404, detail=f"Agent '{request.agent_name}' not found")
         
         if agent.running:
-            return {"message": f"Agent '{request.agent_name}' is already running"}
+            return _message_response(_MSG_ALREADY_RUNNING[request.agent_name])
         
         # Start specific agent
-        if request.agent_name == "cloudtrail":
-            asyncio.create_task(agent.monitor_continuously())
-        elif request.agent_name == "cost":
-            asyncio.create_task(agent.monitor_continuously())
+        orchestrator.start_agent(request.agent_name)
         
-        return {"message": f"Agent '{request.agent_name}' started"}
+        return _message_response(_MSG_STARTED[request.agent_name])
     else:
         # Start all agents
         await orchestrator.start_all_agents()
-        return {"message": "All agents started"}
+        return _message_response(_MSG_ALL_STARTED)
 
 
 @app.post("/api/agents/stop")
-async def stop_agent(request: StartMonitoringRequest):
+async def stop_agent(request: StartMonitoringRequest = Depends(parse_monitoring_request)):
     """Stop a specific agent or all agents."""
+    _invalidate_dashboard_stats()
+    _bump_status_version()
     if request.agent_name:
         agent = orchestrator.get_agent(request.agent_name)
         if not agent:
             raise HTTPException(status_code=404, detail=f"Agent '{request.agent_name}' not found")
         
         agent.stop()
-        return {"message": f"Agent '{request.agent_name}' stopped"}
+        return _message_response(_MSG_STOPPED[request.agent_name])
     else:
         await orchestrator.stop_all_agents()
-        return {"message": "All agents stopped"}
+        return _message_response(_MSG_ALL_STOPPED)
 
 
 @app.get("/api/cloudtrail/events")
@@ -183,12 +326,12 @@ async def get_cloudtrail_events(
     if not agent:
         raise HTTPException(status_code=404, detail="CloudTrail agent not found")
     
-    events = agent.suspicious_events[-limit:] if hasattr(agent, 'suspicious_events') else []
-    return {
+    events = _tail(agent.suspicious_events, limit)
+    return APIJSONResponse({
         "events": events,
         "count": len(events),
-        "total": len(agent.suspicious_events) if hasattr(agent, 'suspicious_events') else 0
-    }
+        "total": len(agent.suspicious_events)
+    })
 
 
 @app.get("/api/cost/anomalies")
@@ -198,41 +341,31 @@ async def get_cost_anomalies(limit: int = 100):
     if not agent:
         raise HTTPException(status_code=404, detail="Cost agent not found")
     
-    anomalies = agent.detected_anomalies[-limit:] if hasattr(agent, 'detected_anomalies') else []
-    return {
+    anomalies = _tail(agent.detected_anomalies, limit)
+    return APIJSONResponse({
         "anomalies": anomalies,
         "count": len(anomalies),
-        "total": len(agent.detected_anomalies) if hasattr(agent, 'detected_anomalies') else 0
-    }
+        "total": len(agent.detected_anomalies)
+    })
 
 
 @app.get("/api/dashboard/stats")
 async def get_dashboard_stats():
     """Get dashboard statistics."""
-    cloudtrail_agent = orchestrator.get_agent("cloudtrail")
-    cost_agent = orchestrator.get_agent("cost")
-    user_analytics_agent = orchestrator.get_agent("user_analytics")
+    global _dashboard_stats_cache
+    cached_at, stats = _dashboard_stats_cache
+    now = time.monotonic()
+    if stats is not None and now - cached_at < DASHBOARD_STATS_TTL_SECONDS:
+        return APIJSONResponse(stats, headers=DASHBOARD_STATS_HEADERS)
     
     stats = {
-        "cloudtrail": {
-            "suspicious_events": len(cloudtrail_agent.suspicious_events) if cloudtrail_agent and hasattr(cloudtrail_agent, 'suspicious_events') else 0,
-            "running": cloudtrail_agent.running if cloudtrail_agent else False,
-            "last_check": cloudtrail_agent.last_check_time.isoformat() if cloudtrail_agent and cloudtrail_agent.last_check_time else None
-        },
-        "cost": {
-            "anomalies": len(cost_agent.detected_anomalies) if cost_agent and hasattr(cost_agent, 'detected_anomalies') else 0,
-            "running": cost_agent.running if cost_agent else False,
-            "last_check": cost_agent.last_check_time.isoformat() if cost_agent and cost_agent.last_check_time else None
-        },
-        "user_analytics": {
-            "users_tracked": len(user_analytics_agent.user_metrics) if user_analytics_agent and hasattr(user_analytics_agent, 'user_metrics') else 0,
-            "running": user_analytics_agent.running if user_analytics_agent else False,
-            "last_analysis": user_analytics_agent.last_analysis_time.isoformat() if user_analytics_agent and user_analytics_agent.last_analysis_time else None
-        },
-        "timestamp": datetime.utcnow().isoformat()
+        **orchestrator.snapshot(),
+        "timestamp": _now_iso
     }
     
-    return stats
+    _dashboard_stats_cache = (now, stats)
+    
+    return APIJSONResponse(stats, headers=DASHBOARD_STATS_HEADERS)
 
 
 @app.get("/api/users/analytics")
@@ -242,10 +375,10 @@ async def get_user_analytics(limit: int = 100):
     if not user_analytics_agent:
         raise HTTPException(status_code=404, detail="User Analytics agent not found")
     
-    return {
-        "users": user_analytics_agent.user_metrics if hasattr(user_analytics_agent, 'user_metrics') else {},
-        "count": len(user_analytics_agent.user_metrics) if hasattr(user_analytics_agent, 'user_metrics') else 0
-    }
+    return APIJSONResponse({
+        "users": user_analytics_agent.user_metrics,
+        "count": len(user_analytics_agent.user_metrics)
+    })
 
 
 @app.get("/api/users/top-by-usage")
@@ -255,11 +388,11 @@ async def get_top_users_by_usage(limit: int = 10):
     if not user_analytics_agent:
         raise HTTPException(status_code=404, detail="User Analytics agent not found")
     
-    top_users = user_analytics_agent.get_top_users_by_usage(limit) if hasattr(user_analytics_agent, 'get_top_users_by_usage') else []
-    return {
+    top_users = user_analytics_agent.get_top_users_by_usage(limit)
+    return APIJSONResponse({
         "users": top_users,
         "count": len(top_users)
-    }
+    })
 
 
 @app.get("/api/users/top-by-cost")
@@ -269,11 +402,11 @@ async def get_top_users_by_cost(limit: int = 10):
     if not user_analytics_agent:
         raise HTTPException(status_code=404, detail="User Analytics agent not found")
     
-    top_users = user_analytics_agent.get_top_users_by_cost(limit) if hasattr(user_analytics_agent, 'get_top_users_by_cost') else []
-    return {
+    top_users = user_analytics_agent.get_top_users_by_cost(limit)
+    return APIJSONResponse({
         "users": top_users,
         "count": len(top_users)
-    }
+    })
 
 
 @app.get("/api/users/inactive")
@@ -283,7 +416,7 @@ async def get_inactive_users(days: int = 30):
     if not user_analytics_agent:
         raise HTTPException(status_code=404, detail="User Analytics agent not found")
     
-    inactive = user_analytics_agent.get_inactive_users(days) if hasattr(user_analytics_agent, 'get_inactive_users') else []
+    inactive = user_analytics_agent.get_inactive_users(days)
     return {
         "users": inactive,
         "count": len(inactive),
@@ -299,13 +432,13 @@ async def get_user_details(user_name: str):
         raise HTTPException(status_code=404, detail="User Analytics agent not found")
     
     # Get user summary
-    summary = user_analytics_agent.user_summaries.get(user_name) if hasattr(user_analytics_agent, 'user_summaries') else None
+    summary = user_analytics_agent.user_summaries.get(user_name)
     
     # Get user metrics
-    metrics = user_analytics_agent.user_metrics.get(user_name) if hasattr(user_analytics_agent, 'user_metrics') else None
+    metrics = user_analytics_agent.user_metrics.get(user_name)
     
     # Get user costs
-    costs = user_analytics_agent.user_costs.get(user_name) if hasattr(user_analytics_agent, 'user_costs') else None
+    costs = user_analytics_agent.user_costs.get(user_name)
     
     if not summary and not metrics:
         raise HTTPException(status_code=404, detail=f"User '{user_name}' not found")
@@ -330,22 +463,24 @@ async def trigger_user_analysis():
         raise HTTPException(status_code=404, detail="CloudTrail agent not found")
     
     # Get events from CloudTrail agent
-    events = cloudtrail_agent.suspicious_events if hasattr(cloudtrail_agent, 'suspicious_events') else []
+    events = cloudtrail_agent.suspicious_events
     
-    # Process events for analytics
-    await user_analytics_agent.process_events_for_analytics(events)
+    # The recent events are a full snapshot, not a new batch, so they replace
+    # the accumulated metrics rather than being counted again
+    await user_analytics_agent.process_events_for_analytics(list(events), replace=True)
     
     return {
         "message": "User analysis completed",
-        "users_analyzed": len(user_analytics_agent.user_metrics) if hasattr(user_analytics_agent, 'user_metrics') else 0
+        "users_analyzed": len(user_analytics_agent.user_metrics)
     }
 
 
 if __name__ == "__main__":
-    import asyncio
     uvicorn.run(
         "main:app",
         host=settings.api_host,
         port=settings.api_port,
-        reload=settings.api_debug
+        reload=settings.api_debug,
+        # Endpoints and agent loops share this event loop; use uvloop when installed
+        loop="uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
     )
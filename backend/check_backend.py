@@ -1,6 +1,38 @@
 """Script to check backend setup and diagnose issues."""
+import importlib
+import importlib.util
 import sys
 import os
+import traceback
+
+# Import names of required packages whose PyPI name differs
+IMPORT_NAMES = {
+    'python-dotenv': 'dotenv'
+}
+
+# Third-party stack shared by config, the agents and the API; loaded up front
+# so the backend module imports below only pay for their own code
+SHARED_IMPORTS = ("pydantic", "fastapi", "boto3")
+
+# Written as-is when no .env exists; bytes, so it is saved in one write with
+# the same line endings on every platform
+EXAMPLE_ENV = b"""# AWS Configuration (optional for test mode)
+AWS_REGION=us-east-1
+# AWS_ACCESS_KEY_ID=
+# AWS_SECRET_ACCESS_KEY=
+
+# Test Mode
+TEST_MODE=true
+USE_SAMPLE_DATA=true
+
+# API Configuration
+API_HOST=0.0.0.0
+API_PORT=8000
+API_DEBUG=true
+
+# Frontend URL
+FRONTEND_URL=http://localhost:3000
+"""
 
 def check_python_version():
     """Check Python version."""
@@ -21,33 +53,46 @@ def check_dependencies():
         'python-dotenv'
     ]
     
+    # Look the packages up without importing them; boto3 alone pulls in botocore
     missing = []
     for package in required:
-        try:
-            __import__(package.replace('-', '_'))
+        if importlib.util.find_spec(IMPORT_NAMES.get(package, package)) is not None:
             print(f"✅ {package} installed")
-        except ImportError:
+        else:
             print(f"❌ {package} NOT installed")
             missing.append(package)
     
     return len(missing) == 0, missing
 
 def check_imports():
-    """Check if backend modules can be imported."""
+    """Check if backend modules can be imported, reporting every failure."""
     print("\nChecking imports...")
+    failures = []  # (what failed to import, exception); tracebacks are printed last
+    
+    for module in SHARED_IMPORTS:
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            print(f"❌ Error importing {module}: {e}")
+            failures.append((module, e))
+    if not failures:
+        print(f"✅ {', '.join(SHARED_IMPORTS)} import successfully")
+    
     try:
         from config import settings
         print("✅ config.py imports successfully")
     except Exception as e:
         print(f"❌ Error importing config: {e}")
-        return False
+        failures.append(("config", e))
     
     try:
-        # Try importing with stub
-        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-        import strands_agents_stub
-        sys.modules['strands_agents'] = strands_agents_stub
-        print("✅ Using strands_agents stub")
+        # Installs the stub when the strands_agents package is missing
+        import _bootstrap
+        import strands_agents
+        if strands_agents.__name__ == "strands_agents_stub":
+            print("✅ Using strands_agents stub")
+        else:
+            print("✅ Using strands_agents package")
     except Exception as e:
         print(f"⚠️  Warning: {e}")
     
@@ -56,20 +101,20 @@ def check_imports():
         print("✅ OrchestratorAgent imports successfully")
     except Exception as e:
         print(f"❌ Error importing OrchestratorAgent: {e}")
-        import traceback
-        traceback.print_exc()
-        return False
+        failures.append(("OrchestratorAgent", e))
     
     try:
         from api.main import app
         print("✅ API app imports successfully")
     except Exception as e:
         print(f"❌ Error importing API: {e}")
-        import traceback
-        traceback.print_exc()
-        return False
+        failures.append(("API", e))
     
-    return True
+    for name, error in failures:
+        print(f"\n--- {name} ---")
+        print("".join(traceback.format_exception(type(error), error, error.__traceback__)), end="")
+    
+    return not failures
 
 def check_env_file():
     """Check if .env file exists."""
@@ -81,24 +126,8 @@ def check_env_file():
         print(f"⚠️  .env file not found at {env_path}")
         print("   Creating example .env file...")
         try:
-            with open(env_path, 'w') as f:
-                f.write("""# AWS Configuration (optional for test mode)
-AWS_REGION=us-east-1
-# AWS_ACCESS_KEY_ID=
-# AWS_SECRET_ACCESS_KEY=
-
-# Test Mode
-TEST_MODE=true
-USE_SAMPLE_DATA=true
-
-# API Configuration
-API_HOST=0.0.0.0
-API_PORT=8000
-API_DEBUG=true
-
-# Frontend URL
-FRONTEND_URL=http://localhost:3000
-""")
+            with open(env_path, 'wb') as f:
+                f.write(EXAMPLE_ENV)
             print("   ✅ Created .env file")
             return True
         except Exception as e:
@@ -1,19 +1,13 @@
 """Demo script to show User Analytics Agent with sample data."""
 import sys
-import os
 import asyncio
-import json
-from datetime import datetime
+from collections import Counter
+from datetime import date, timedelta
+from functools import lru_cache
+import numpy as np
 
-# Add current directory to path
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-
-# Load strands_agents stub
-try:
-    import strands_agents
-except ImportError:
-    import strands_agents_stub
-    sys.modules['strands_agents'] = strands_agents_stub
+# Backend import path and strands_agents stub
+import _bootstrap
 
 from utils.sample_data import (
     generate_sample_cloudtrail_events,
@@ -21,6 +15,7 @@ from utils.sample_data import (
     generate_sample_user_analytics,
     generate_sample_user_costs
 )
+from utils.fixture_cache import cached
 from agents.user_analytics_agent import UserAnalyticsAgent
 from tools.user_analytics_tools import (
     aggregate_usage_by_user,
@@ -36,6 +31,59 @@ def print_section(title):
     print("=" * 80)
 
 
+def _format_value(value) -> str:
+    """Format a table cell: thousands separators for ints, one decimal for floats."""
+    if isinstance(value, float):
+        return f"{value:.1f}"
+    if isinstance(value, int):
+        return f"{value:,}"
+    return str(value)
+
+
+def _format_cost(value) -> str:
+    """Format a cost table cell as dollars."""
+    if isinstance(value, float):
+        return f"${value:,.2f}"
+    return _format_value(value)
+
+
+def _format_count(value) -> str:
+    """Format a count table cell, checking for the expected int first."""
+    if type(value) is int:
+        return f"{value:,}"
+    return _format_value(value)
+
+
+def _format_score(value) -> str:
+    """Format a score table cell, checking for the expected float first."""
+    if type(value) is float:
+        return f"{value:.1f}"
+    return _format_value(value)
+
+
+def _pick_formatter(column: str):
+    """Choose a column's cell formatter once, from the column name."""
+    if column == "user_name":
+        return str
+    if "cost" in column:
+        return _format_cost
+    if column.endswith("_score"):
+        return _format_score
+    if column.endswith(("_events", "_count")):
+        return _format_count
+    return _format_value
+
+
+@lru_cache(maxsize=None)
+def _table_layout(columns: tuple):
+    """Build the row template, cell formatters, header and separator for a column set."""
+    template = "  " + " | ".join(["{:<20}"] * len(columns))
+    formatters = [_pick_formatter(col) for col in columns]
+    header = template.format(*(col.replace("_", " ").title() for col in columns))
+    separator = "  " + "-" * (len(header) - 2)
+    return template, formatters, header, separator
+
+
 def print_user_table(users, columns=None):
     """Print users in a formatted table."""
     if not users:
@@ -45,22 +93,19 @@ def print_user_table(users, columns=None):
     if columns is None:
         columns = ["user_name", "total_events", "activity_score", "total_cost"]
     
+    # Layouts are built once per column set and reused on later tables
+    template, formatters, header, separator = _table_layout(tuple(columns))
+    
     # Print header
-    header = " | ".join([col.replace("_", " ").title().ljust(20) for col in columns])
-    print(f"\n  {header}")
-    print("  " + "-" * len(header))
+    print(f"\n{header}")
+    print(separator)
     
     # Print rows
     for user in users[:10]:  # Limit to top 10
-        row = []
-        for col in columns:
-            value = user.get(col, "N/A")
-            if isinstance(value, float):
-                value = f"${value:,.2f}" if "cost" in col else f"{value:.1f}"
-            elif isinstance(value, int):
-                value = f"{value:,}"
-            row.append(str(value).ljust(20))
-        print(f"  {' | '.join(row)}")
+        print(template.format(*(
+            format_cell(user.get(col, "N/A"))
+            for col, format_cell in zip(columns, formatters)
+        )))
 
 
 async def demo_user_analytics():
@@ -81,25 +126,32 @@ async def demo_user_analytics():
     # Generate sample data
     print_section("2. Generating Sample Data")
     print("  Generating CloudTrail events for 100 users...")
-    events = generate_sample_cloudtrail_events(count=200)
+    events = cached("cloudtrail_events", generate_sample_cloudtrail_events, count=200)
     print(f"  ✅ Generated {len(events)} CloudTrail events")
     
     print("  Generating cost data...")
-    cost_data = []
-    for i in range(30):  # 30 days of cost data
-        cost_data.append({
-            "Date": (datetime.now() - timedelta(days=i)).strftime("%Y-%m-%d"),
+    today = date.today()
+    cost_data = [
+        {
+            "Date": (today - timedelta(days=i)).isoformat(),
             "Service": "EC2",
             "Region": "us-east-1",
             "Amount": str(1000 + i * 50)
-        })
+        }
+        for i in range(30)  # 30 days of cost data
+    ]
     print(f"  ✅ Generated {len(cost_data)} cost entries")
     
-    # Process events for user analytics
+    # Process events for user analytics and attribute costs concurrently; the
+    # two steps only read the generated data and update separate agent state
     print_section("3. Processing Events for User Analytics")
     print("  Analyzing events to extract person-level metrics...")
+    print("  Attributing AWS costs to individual users...")
     
-    usage_metrics = await agent.process_events_for_analytics(events)
+    usage_metrics, cost_attribution = await asyncio.gather(
+        agent.process_events_for_analytics(events),
+        agent.process_costs_for_attribution(cost_data, events)
+    )
     
     print(f"  ✅ Analyzed {len(usage_metrics)} unique users")
     print(f"  📊 Metrics tracked per user:")
@@ -109,12 +161,7 @@ async def demo_user_analytics():
     print(f"     - Activity score")
     print(f"     - First/last seen timestamps")
     
-    # Process costs for attribution
     print_section("4. Attributing Costs to Users")
-    print("  Attributing AWS costs to individual users...")
-    
-    cost_attribution = await agent.process_costs_for_attribution(cost_data, events)
-    
     print(f"  ✅ Attributed costs to {len(cost_attribution)} users")
     print(f"  💰 Cost metrics per user:")
     print(f"     - Total cost")
@@ -161,7 +208,7 @@ async def demo_user_analytics():
     # Show detailed user example
     print_section("8. Detailed User Example")
     if usage_metrics:
-        sample_user = list(usage_metrics.keys())[0]
+        sample_user = next(iter(usage_metrics))
         user_details = agent.user_summaries.get(sample_user, {})
         user_metrics = usage_metrics.get(sample_user, {})
         user_costs = cost_attribution.get(sample_user, {})
@@ -193,41 +240,57 @@ async def demo_user_analytics():
     # Summary statistics
     print_section("9. Summary Statistics")
     total_users = len(usage_metrics)
-    total_events = sum(m.get('total_events', 0) for m in usage_metrics.values())
-    total_cost = sum(c.get('total_cost', 0) for c in cost_attribution.values())
+    # Both aggregations initialize total_events / total_cost for every user
+    total_cost = float(np.fromiter(
+        (c['total_cost'] for c in cost_attribution.values()),
+        dtype=np.float64,
+        count=len(cost_attribution)
+    ).sum())
     
-    # Categorize users
-    usage_categories = {"inactive": 0, "light": 0, "moderate": 0, "heavy": 0, "very_heavy": 0}
-    for user_name, summary in agent.user_summaries.items():
-        category = summary.get('usage_category', 'inactive')
-        usage_categories[category] = usage_categories.get(category, 0) + 1
+    # Total events and categorize users in one pass (summaries share the metrics' keys)
+    total_events = 0
+    category_counts = Counter()
+    for user_name, metrics in usage_metrics.items():
+        total_events += metrics['total_events']
+        category_counts[agent.user_summaries.get(user_name, {}).get('usage_category', 'inactive')] += 1
+    usage_categories = {
+        category: category_counts[category]
+        for category in ("inactive", "light", "moderate", "heavy", "very_heavy")
+    }
     
-    print(f"\n  📊 Overall Statistics:")
-    print(f"     - Total Users Tracked: {total_users}")
-    print(f"     - Total Events: {total_events:,}")
-    print(f"     - Total Cost Attributed: ${total_cost:,.2f}")
-    print(f"\n  👥 Usage Distribution:")
-    for category, count in usage_categories.items():
-        if count > 0:
-            percentage = (count / total_users) * 100
-            print(f"     - {category.title()}: {count} users ({percentage:.1f}%)")
+    distribution = "".join(
+        f"\n     - {category.title()}: {count} users ({count / total_users * 100:.1f}%)"
+        for category, count in usage_categories.items()
+        if count > 0
+    )
+    print(f"""
+  📊 Overall Statistics:
+     - Total Users Tracked: {total_users}
+     - Total Events: {total_events:,}
+     - Total Cost Attributed: ${total_cost:,.2f}
+
+  👥 Usage Distribution:{distribution}""")
     
     # Show what this means for hundreds of users
     print_section("10. Scaling to Hundreds of Users")
-    print("\n  ✅ The system is designed to handle hundreds of users:")
-    print(f"     - Currently tracking: {total_users} users")
-    print(f"     - Can scale to: 1000+ users")
-    print(f"     - Each user tracked individually with:")
-    print(f"       • Usage metrics (events, services, regions)")
-    print(f"       • Cost attribution (total, by service, by region)")
-    print(f"       • Activity scoring and categorization")
-    print(f"       • Inactive user detection")
-    
-    print("\n  📈 Key Insights You Can Get:")
-    print(f"     • Who is your most active user? → {top_users_usage[0]['user_name'] if top_users_usage else 'N/A'}")
-    print(f"     • Who is costing the most? → {top_users_cost[0]['user_name'] if top_users_cost else 'N/A'}")
-    print(f"     • How many inactive users? → {len(inactive_users)}")
-    print(f"     • Average cost per user? → ${total_cost/total_users:,.2f}" if total_users > 0 else "     • Average cost per user? → N/A")
+    most_active = top_users_usage[0]['user_name'] if top_users_usage else 'N/A'
+    most_costly = top_users_cost[0]['user_name'] if top_users_cost else 'N/A'
+    average_cost = f"${total_cost / total_users:,.2f}" if total_users > 0 else "N/A"
+    print(f"""
+  ✅ The system is designed to handle hundreds of users:
+     - Currently tracking: {total_users} users
+     - Can scale to: 1000+ users
+     - Each user tracked individually with:
+       • Usage metrics (events, services, regions)
+       • Cost attribution (total, by service, by region)
+       • Activity scoring and categorization
+       • Inactive user detection
+
+  📈 Key Insights You Can Get:
+     • Who is your most active user? → {most_active}
+     • Who is costing the most? → {most_costly}
+     • How many inactive users? → {len(inactive_users)}
+     • Average cost per user? → {average_cost}""")
     
     print_section("Demo Complete!")
     print("\n  ✅ User Analytics Agent successfully tracks:")
@@ -239,8 +302,10 @@ async def demo_user_analytics():
 
 
 if __name__ == "__main__":
-    # Import timedelta
-    from datetime import timedelta
+    # Block-buffer stdout so the demo's many print() calls are written in a few
+    # large chunks instead of one write per line on a terminal
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(line_buffering=False)
     
     print("\n" + "=" * 80)
     print("  Starting User Analytics Demo...")
@@ -252,5 +317,8 @@ if __name__ == "__main__":
         print("\n\n  Demo interrupted by user.")
     except Exception as e:
         print(f"\n\n  ❌ Error during demo: {e}")
+        sys.stdout.flush()
         import traceback
         traceback.print_exc()
+    finally:
+        sys.stdout.flush()
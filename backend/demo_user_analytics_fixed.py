@@ -1,32 +1,49 @@
 """Demo script to show User Analytics Agent with properly formatted sample data."""
-import sys
-import os
 import asyncio
-import json
+from collections import Counter
 from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Iterator
 import random
+import numpy as np
 
-# Add current directory to path
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-
-# Load strands_agents stub
-try:
-    import strands_agents
-except ImportError:
-    import strands_agents_stub
-    sys.modules['strands_agents'] = strands_agents_stub
+# Backend import path and strands_agents stub
+import _bootstrap
 
 from agents.user_analytics_agent import UserAnalyticsAgent
 from tools.user_analytics_tools import (
     aggregate_usage_by_user,
+    aggregate_usage_columnar,
     attribute_costs_to_users,
+    events_to_columns,
     get_user_usage_summary
 )
 
+# Header labels for table columns; other columns are title-cased from their name
+COLUMN_HEADERS = {
+    "total_events": "Total Events",
+    "activity_score": "Activity Score",
+    "total_cost": "Total Cost",
+    "write_events": "Write Events",
+    "high_risk_events": "High Risk",
+    "resource_count": "Resources"
+}
+
+# Usage categories in the order they are reported
+USAGE_CATEGORIES = ("inactive", "light", "moderate", "heavy", "very_heavy")
+
+# Approximate number of events whose random fields are drawn together when
+# streaming generated events
+EVENT_BATCH_SIZE = 4096
+
 
 def generate_realistic_events_for_users(user_count=50, events_per_user=20):
     """Generate realistic CloudTrail events with proper user structure."""
-    events = []
+    return list(iter_realistic_events_for_users(user_count, events_per_user))
+
+
+def iter_realistic_events_for_users(user_count=50, events_per_user=20) -> Iterator[Dict]:
+    """Yield realistic CloudTrail events user by user, holding one batch of random draws at a time."""
     users = [f"user{i}@example.com" for i in range(1, user_count + 1)]
     
     event_types = [
@@ -38,60 +55,96 @@ def generate_realistic_events_for_users(user_count=50, events_per_user=20):
         {"name": "ListBuckets", "read_only": True},
     ]
     
-    base_time = datetime.utcnow()
+    regions = ["us-east-1", "us-west-2", "eu-west-1"]
     
-    for user_name in users:
-        for i in range(events_per_user):
-            event_type = random.choice(event_types)
-            event_time = base_time - timedelta(
-                days=random.randint(0, 30),
-                hours=random.randint(0, 23),
-                minutes=random.randint(0, 59)
+    # Resolve each event type's fields once instead of per event
+    event_fields = [
+        (event_type["name"], event_type["read_only"],
+         "ec2.amazonaws.com" if "Instance" in event_type["name"] else "s3.amazonaws.com")
+        for event_type in event_types
+    ]
+    user_arns = [f"arn:aws:iam::123456789012:user/{user_name}" for user_name in users]
+    
+    rng = np.random.default_rng()
+    base_time = np.datetime64(datetime.utcnow(), "us")
+    users_per_batch = max(1, EVENT_BATCH_SIZE // max(1, events_per_user))
+    
+    for batch_start in range(0, user_count, users_per_batch):
+        batch_users = min(users_per_batch, user_count - batch_start)
+        
+        # Draw every random field for the batch at once, in user-major order, and
+        # convert to Python lists so the loop below indexes native values
+        total = batch_users * events_per_user
+        type_idxs = rng.integers(0, len(event_types), size=total).tolist()
+        region_idxs = rng.integers(0, len(regions), size=total).tolist()
+        ip_last_octets = rng.integers(1, 256, size=total).tolist()
+        principal_ids = rng.integers(1000000000, 10000000000, size=total).tolist()
+        offset_seconds = (
+            rng.integers(0, 31, size=total) * 86400
+            + rng.integers(0, 24, size=total) * 3600
+            + rng.integers(0, 60, size=total) * 60
+        )
+        # Formatted as UTC ISO-8601 strings with the "Z" suffix in one call
+        event_times = np.datetime_as_string(
+            base_time - offset_seconds.astype("timedelta64[s]"), unit="us", timezone="UTC"
+        ).tolist()
+        
+        for j in range(total):
+            user_idx, event_idx = divmod(j, events_per_user)
+            user_idx += batch_start
+            yield _realistic_event(
+                users[user_idx], user_arns[user_idx], event_idx, event_fields[type_idxs[j]],
+                event_times[j], regions[region_idxs[j]], ip_last_octets[j], principal_ids[j]
             )
-            
-            event = {
-                "event_id": f"event-{user_name}-{i}",
-                "event_time": event_time.isoformat() + "Z",
-                "event_name": event_type["name"],
-                "event_source": "ec2.amazonaws.com" if "Instance" in event_type["name"] else "s3.amazonaws.com",
-                "aws_region": random.choice(["us-east-1", "us-west-2", "eu-west-1"]),
-                "source_ip": f"192.168.1.{random.randint(1, 255)}",
-                "user_agent": "aws-cli/2.0.0",
-                "user_identity": {
-                    "type": "IAMUser",
-                    "principal_id": f"AIDA{random.randint(1000000000, 9999999999)}",
-                    "arn": f"arn:aws:iam::123456789012:user/{user_name}",
-                    "account_id": "123456789012",
-                    "userName": user_name
-                },
-                "resources": [],
-                "request_parameters": {},
-                "response_elements": {},
-                "read_only": event_type["read_only"],
-                "management_event": True
-            }
-            events.append(event)
-    
-    return events
+
+
+def _realistic_event(user_name, user_arn, event_idx, event_fields, event_time, region, ip_last_octet, principal_id):
+    """Build one generated CloudTrail event."""
+    event_name, read_only, event_source = event_fields
+    return {
+        "event_id": f"event-{user_name}-{event_idx}",
+        "event_time": event_time,
+        "event_name": event_name,
+        "event_source": event_source,
+        "aws_region": region,
+        "source_ip": f"192.168.1.{ip_last_octet}",
+        "user_agent": "aws-cli/2.0.0",
+        "user_identity": {
+            "type": "IAMUser",
+            "principal_id": f"AIDA{principal_id}",
+            "arn": user_arn,
+            "account_id": "123456789012",
+            "userName": user_name
+        },
+        "resources": [],
+        "request_parameters": {},
+        "response_elements": {},
+        "read_only": read_only,
+        "management_event": True
+    }
 
 
 def generate_cost_data_for_attribution():
     """Generate cost data for attribution."""
-    cost_data = []
     services = ["EC2", "S3", "RDS", "Lambda"]
     regions = ["us-east-1", "us-west-2"]
-    
-    for i in range(30):
-        for service in services:
-            for region in regions:
-                cost_data.append({
-                    "Date": (datetime.now() - timedelta(days=i)).strftime("%Y-%m-%d"),
-                    "Service": service,
-                    "Region": region,
-                    "Amount": str(random.uniform(50, 500))
-                })
-    
-    return cost_data
+    days = 30
+    
+    # One batch of amounts, consumed in (day, service, region) order
+    amounts = iter(np.random.default_rng().uniform(50, 500, size=days * len(services) * len(regions)).tolist())
+    now = datetime.now()
+    
+    return [
+        {
+            "Date": (now - timedelta(days=i)).strftime("%Y-%m-%d"),
+            "Service": service,
+            "Region": region,
+            "Amount": str(next(amounts))
+        }
+        for i in range(days)
+        for service in services
+        for region in regions
+    ]
 
 
 def print_section(title):
@@ -101,6 +154,41 @@ def print_section(title):
     print("=" * 80)
 
 
+def _format_cell(value, is_cost: bool = False) -> str:
+    """Format any table cell: dollars for cost floats, one decimal for other floats, truncated long strings."""
+    if isinstance(value, float):
+        return f"${value:,.2f}" if is_cost else f"{value:.1f}"
+    if isinstance(value, int):
+        return f"{value:,}"
+    if isinstance(value, str) and len(value) > 25:
+        return value[:22] + "..."
+    return str(value)
+
+
+def _make_formatter(column: str):
+    """Build a column's padded cell formatter once, checking for the column's expected type first."""
+    if column == "user_name":
+        return lambda value: _format_cell(value).ljust(30)
+    if "cost" in column.lower():
+        return lambda value: (f"${value:,.2f}" if type(value) is float else _format_cell(value, True)).rjust(15)
+    if column.endswith(("_events", "_count")):
+        return lambda value: (f"{value:,}" if type(value) is int else _format_cell(value)).rjust(15)
+    return lambda value: _format_cell(value).rjust(15)
+
+
+@lru_cache(maxsize=None)
+def _table_layout(columns: tuple):
+    """Build the cell formatters, header and separator for a column set."""
+    formatters = [_make_formatter(col) for col in columns]
+    header = " | ".join(
+        "User Name".ljust(30) if col == "user_name"
+        else COLUMN_HEADERS[col].rjust(15) if col in COLUMN_HEADERS
+        else col.replace("_", " ").title().ljust(15)
+        for col in columns
+    )
+    return formatters, f"\n  {header}", "  " + "-" * len(header)
+
+
 def print_user_table(users, columns=None):
     """Print users in a formatted table."""
     if not users:
@@ -110,51 +198,19 @@ def print_user_table(users, columns=None):
     if columns is None:
         columns = ["user_name", "total_events", "activity_score"]
     
+    # Layouts are built once per column set and reused on later tables
+    formatters, header, separator = _table_layout(tuple(columns))
+    
     # Print header
-    header_parts = []
-    for col in columns:
-        if col == "user_name":
-            header_parts.append("User Name".ljust(30))
-        elif col == "total_events":
-            header_parts.append("Total Events".rjust(15))
-        elif col == "activity_score":
-            header_parts.append("Activity Score".rjust(15))
-        elif col == "total_cost":
-            header_parts.append("Total Cost".rjust(15))
-        elif col == "write_events":
-            header_parts.append("Write Events".rjust(15))
-        elif col == "high_risk_events":
-            header_parts.append("High Risk".rjust(15))
-        elif col == "resource_count":
-            header_parts.append("Resources".rjust(15))
-        else:
-            header_parts.append(col.replace("_", " ").title().ljust(15))
-    
-    header = " | ".join(header_parts)
-    print(f"\n  {header}")
-    print("  " + "-" * len(header))
+    print(header)
+    print(separator)
     
     # Print rows
     for user in users[:15]:  # Limit to top 15
-        row = []
-        for col in columns:
-            value = user.get(col, "N/A")
-            if isinstance(value, float):
-                if "cost" in col.lower():
-                    value = f"${value:,.2f}"
-                else:
-                    value = f"{value:.1f}"
-            elif isinstance(value, int):
-                value = f"{value:,}"
-            elif isinstance(value, str) and len(value) > 25:
-                value = value[:22] + "..."
-            
-            if col == "user_name":
-                row.append(str(value).ljust(30))
-            else:
-                row.append(str(value).rjust(15))
-        
-        print(f"  {' | '.join(row)}")
+        print("  " + " | ".join(
+            format_cell(user.get(col, "N/A"))
+            for col, format_cell in zip(columns, formatters)
+        ))
 
 
 async def demo_user_analytics():
@@ -186,12 +242,14 @@ async def demo_user_analytics():
     print_section("3. Processing Events for User Analytics")
     print("  Analyzing events to extract person-level metrics...")
     
-    usage_metrics = await agent.process_events_for_analytics(events)
+    # Aggregate over per-field arrays rather than the event dicts
+    columns = events_to_columns(events)
+    usage_metrics = await agent.process_events_for_analytics(events, columns)
     
     print(f"  ✅ Analyzed {len(usage_metrics)} unique users")
     
     if usage_metrics:
-        sample_user = list(usage_metrics.keys())[0]
+        sample_user = next(iter(usage_metrics))
         sample_metrics = usage_metrics[sample_user]
         print(f"\n  📊 Example metrics for {sample_user}:")
         print(f"     - Total Events: {sample_metrics.get('total_events', 0):,}")
@@ -209,7 +267,7 @@ async def demo_user_analytics():
     print(f"  ✅ Attributed costs to {len(cost_attribution)} users")
     
     if cost_attribution:
-        sample_user = list(cost_attribution.keys())[0]
+        sample_user = next(iter(cost_attribution))
         sample_costs = cost_attribution[sample_user]
         print(f"\n  💰 Example cost attribution for {sample_user}:")
         print(f"     - Total Cost: ${sample_costs.get('total_cost', 0):,.2f}")
@@ -218,6 +276,9 @@ async def demo_user_analytics():
     
     # Show top users by usage
     print_section("5. Top 15 Users by Activity/Usage")
+    # The agent selects the top N with a partial partition (no full sort of all
+    # users) and reuses the ranking until the metrics change, so asking for a
+    # small limit stays cheap as the user count grows
     top_users_usage = agent.get_top_users_by_usage(limit=15)
     print_user_table(top_users_usage, ["user_name", "total_events", "write_events", "high_risk_events", "activity_score"])
     
@@ -261,7 +322,7 @@ async def demo_user_analytics():
     # Show detailed user example
     print_section("8. Detailed User Example")
     if usage_metrics:
-        sample_user = list(usage_metrics.keys())[0]
+        sample_user = next(iter(usage_metrics))
         user_details = agent.user_summaries.get(sample_user, {})
         user_metrics = usage_metrics.get(sample_user, {})
         user_costs = cost_attribution.get(sample_user, {})
@@ -294,14 +355,21 @@ async def demo_user_analytics():
     # Summary statistics
     print_section("9. Summary Statistics")
     total_users = len(usage_metrics)
-    total_events = sum(m.get('total_events', 0) for m in usage_metrics.values())
-    total_cost = sum(c.get('total_cost', 0) for c in cost_attribution.values())
+    
+    # Collect each metric into an array once and reduce it with numpy
+    event_counts = np.fromiter(
+        (m.get('total_events', 0) for m in usage_metrics.values()), dtype=np.int64, count=total_users
+    )
+    costs = np.fromiter(
+        (c.get('total_cost', 0) for c in cost_attribution.values()), dtype=np.float64, count=len(cost_attribution)
+    )
+    total_events = int(event_counts.sum())
+    total_cost = float(costs.sum())
     
     # Categorize users
-    usage_categories = {"inactive": 0, "light": 0, "moderate": 0, "heavy": 0, "very_heavy": 0}
-    for user_name, summary in agent.user_summaries.items():
-        category = summary.get('usage_category', 'inactive')
-        usage_categories[category] = usage_categories.get(category, 0) + 1
+    usage_categories = Counter(
+        summary.get('usage_category', 'inactive') for summary in agent.user_summaries.values()
+    )
     
     print(f"\n  📊 Overall Statistics:")
     print(f"     - Total Users Tracked: {total_users}")
@@ -312,7 +380,8 @@ async def demo_user_analytics():
         print(f"     - Average Cost per User: ${total_cost / total_users:,.2f}")
     
     print(f"\n  👥 Usage Distribution:")
-    for category, count in usage_categories.items():
+    for category in USAGE_CATEGORIES:
+        count = usage_categories[category]
         if count > 0:
             percentage = (count / total_users) * 100 if total_users > 0 else 0
             print(f"     - {category.title()}: {count} users ({percentage:.1f}%)")
@@ -328,6 +397,11 @@ async def demo_user_analytics():
     print(f"       • Activity scoring and categorization")
     print(f"       • Inactive user detection")
     
+    # Aggregate a larger population straight from the generator: events are
+    # reduced to columns as they are produced, never held as a list of dicts
+    streamed_metrics = aggregate_usage_columnar(events_to_columns(iter_realistic_events_for_users(1000, 30)))
+    print(f"     - Streamed check: {len(streamed_metrics)} users aggregated from 30,000 generated events")
+    
     print("\n  📈 Key Insights You Can Get:")
     if top_users_usage:
         print(f"     • Who is your most active user? → {top_users_usage[0]['user_name']}")
@@ -0,0 +1,25 @@
+"""
+Gunicorn configuration for running the API in production.
+
+Usage (from the backend directory):
+    gunicorn -c gunicorn_conf.py api.main:app
+"""
+import os
+from config import settings
+
+bind = f"{settings.api_host}:{settings.api_port}"
+
+# Uvicorn workers run on uvloop with the httptools parser when they are installed
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Each worker process runs its own orchestrator, so agent state and alerts are
+# per process. Keep a single worker unless monitoring state is moved to a shared
+# store; set WEB_CONCURRENCY (e.g. 2 * CPUs + 1) to scale stateless deployments.
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+# Agents shut down by cancellation and flush pending alerts on exit
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = "-"
+loglevel = "debug" if settings.api_debug else "info"
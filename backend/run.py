@@ -7,5 +7,8 @@ if __name__ == "__main__":
         "api.main:app",
         host=settings.api_host,
         port=settings.api_port,
-        reload=settings.api_debug
+        reload=settings.api_debug,
+        # The agents' monitoring loops run on uvicorn's event loop, which is
+        # uvloop whenever it is installed (see requirements.txt)
+        loop="auto"
     )
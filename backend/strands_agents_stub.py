@@ -4,11 +4,12 @@ This allows the code to run without the actual strands_agents package installed.
 In production, replace this with the actual strands_agents import.
 """
 import asyncio
-from typing import Callable, List, Any
+from typing import Callable, List
 from functools import wraps
+from utils.tool_runtime import ToolRuntimeMixin
 
 
-class Agent:
+class Agent(ToolRuntimeMixin):
     """Base Agent class stub."""
     
     def __init__(self, name: str, description: str = "", tools: List = None):
@@ -22,32 +23,9 @@ class Agent:
                 elif callable(tool):
                     self.tools_dict[tool.__name__] = tool
         self.tools = tools or []
-    
-    async def execute_tool(self, tool_name: str, **kwargs):
-        """Execute a tool by name."""
-        # First check tools_dict
-        if tool_name in self.tools_dict:
-            func = self.tools_dict[tool_name]
-            if asyncio.iscoroutinefunction(func):
-                return await func(**kwargs)
-            else:
-                return func(**kwargs)
-        
-        # Then check tools list
-        for tool in self.tools:
-            if hasattr(tool, 'func') and tool.func.__name__ == tool_name:
-                func = tool.func
-                if asyncio.iscoroutinefunction(func):
-                    return await func(**kwargs)
-                else:
-                    return func(**kwargs)
-            elif callable(tool) and tool.__name__ == tool_name:
-                if asyncio.iscoroutinefunction(tool):
-                    return await tool(**kwargs)
-                else:
-                    return tool(**kwargs)
-        
-        raise ValueError(f"Tool '{tool_name}' not found. Available: {list(self.tools_dict.keys())}")
+        self._init_tool_runtime()
+        for tool_name, func in self.tools_dict.items():
+            self._register_tool(tool_name, func)
 
 
 class Tool:
@@ -61,6 +39,14 @@ class Tool:
 
 def tool(func: Callable) -> Callable:
     """Decorator to mark a function as a tool."""
+    if asyncio.iscoroutinefunction(func):
+        # Keep coroutine tools detectable as coroutine functions
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            return await func(*args, **kwargs)
+        async_wrapper._is_tool = True
+        return async_wrapper
+    
     @wraps(func)
     def wrapper(*args, **kwargs):
         return func(*args, **kwargs)
@@ -11,7 +11,8 @@ print("=" * 60)
 try:
     # Test imports
     print("1. Testing imports...")
-    from api.main import app, orchestrator
+    from api.main import app
+    from agents.orchestrator_agent import OrchestratorAgent
     print("   ✅ All imports successful")
     
     # Test app creation
@@ -19,9 +20,9 @@ try:
     assert app is not None
     print("   ✅ FastAPI app created")
     
-    # Test orchestrator
+    # Test orchestrator (the app builds its own on startup)
     print("3. Testing orchestrator...")
-    assert orchestrator is not None
+    orchestrator = OrchestratorAgent()
     print(f"   ✅ Orchestrator created: {orchestrator.name}")
     
     # Test agents
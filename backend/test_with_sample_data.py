@@ -1,7 +1,7 @@
 """Test script to inject sample data and verify the system."""
 import asyncio
-import requests
-import time
+import aiohttp
+import orjson
 from utils.sample_data import (
     generate_sample_cloudtrail_events,
     generate_sample_cost_anomalies
@@ -9,83 +9,189 @@ from utils.sample_data import (
 
 API_URL = "http://localhost:8000"
 
+# Keep-alive connections pooled for the test session; enough for the
+# concurrent read checks to each reuse a socket
+MAX_CONNECTIONS = 8
 
-def test_inject_sample_data():
+# Most events (and anomalies) injected per request, mirroring CloudTrail's
+# 100-events-per-call batching; larger injections are split and sent concurrently
+INJECT_BATCH_SIZE = 100
+
+# Backoff between /health probes while waiting for the API to come up
+READY_PROBE_DELAYS = (0.05, 0.1, 0.2, 0.4, 0.8, 1.0, 1.0)
+
+
+async def _get_json(session: aiohttp.ClientSession, path: str):
+    """GET an API path, returning the status code and the JSON body (None unless 200)."""
+    async with session.get(path) as response:
+        return response.status, (await response.json(loads=orjson.loads) if response.status == 200 else None)
+
+
+async def _inject_batch(
+    session: aiohttp.ClientSession,
+    cloudtrail_events_count: int,
+    cost_anomalies_count: int,
+    clear_existing: bool = False
+):
+    """POST one injection request, returning the status code and the JSON body (response text unless 200)."""
+    payload = {
+        "cloudtrail_events_count": cloudtrail_events_count,
+        "cost_anomalies_count": cost_anomalies_count,
+        "clear_existing": clear_existing
+    }
+    async with session.post(
+        "/api/test/inject-sample-data",
+        json=payload,
+        timeout=aiohttp.ClientTimeout(total=10)
+    ) as response:
+        if response.status == 200:
+            return response.status, await response.json(loads=orjson.loads)
+        return response.status, await response.text()
+
+
+async def _inject_in_batches(
+    session: aiohttp.ClientSession,
+    cloudtrail_events_count: int,
+    cost_anomalies_count: int
+):
+    """
+    Replace the API's data with freshly injected samples, at most INJECT_BATCH_SIZE
+    of each kind per request. The first request clears existing data, so it runs
+    before the remaining batches, which are sent concurrently.
+    """
+    batch_count = max(1, -(-max(cloudtrail_events_count, cost_anomalies_count) // INJECT_BATCH_SIZE))
+    batches = [
+        (
+            max(0, min(INJECT_BATCH_SIZE, cloudtrail_events_count - start)),
+            max(0, min(INJECT_BATCH_SIZE, cost_anomalies_count - start))
+        )
+        for start in range(0, batch_count * INJECT_BATCH_SIZE, INJECT_BATCH_SIZE)
+    ]
+    
+    first = await _inject_batch(session, *batches[0], clear_existing=True)
+    if first[0] != 200:
+        return [first]
+    rest = await asyncio.gather(*(_inject_batch(session, *batch) for batch in batches[1:]))
+    return [first, *rest]
+
+
+async def _wait_until_ready(session: aiohttp.ClientSession) -> bool:
+    """Probe /health with backoff until the API answers, instead of sleeping a fixed time."""
+    for delay in READY_PROBE_DELAYS:
+        try:
+            async with session.get("/health", timeout=aiohttp.ClientTimeout(total=0.5)) as response:
+                if response.status == 200:
+                    return True
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            pass
+        await asyncio.sleep(delay)
+    return False
+
+
+async def test_inject_sample_data():
     """Inject sample data into the system."""
-    print("=" * 60)
-    print("AWS Track Agent - Sample Data Test")
-    print("=" * 60)
+    # One session bound to API_URL, so every request reuses pooled connections
+    async with aiohttp.ClientSession(
+        base_url=API_URL,
+        connector=aiohttp.TCPConnector(limit=MAX_CONNECTIONS),
+        timeout=aiohttp.ClientTimeout(total=5),
+        json_serialize=lambda obj: orjson.dumps(obj).decode()
+    ) as session:
+        # Not fatal: the health check below reports an API that never came up
+        await _wait_until_ready(session)
+        
+        print("=" * 60)
+        print("AWS Track Agent - Sample Data Test")
+        print("=" * 60)
+        
+        if not await _run_checks(session):
+            return
     
+    print("\n" + "=" * 60)
+    print("Test Complete!")
+    print("=" * 60)
+    print("\nNext steps:")
+    print("1. Open http://localhost:3000 in your browser to view the dashboard")
+    print("2. The dashboard should show the injected sample data")
+    print("3. Try injecting more data: POST /api/test/inject-sample-data")
+    print("4. Clear data: POST /api/test/clear-all-data")
+
+
+async def _run_checks(session: aiohttp.ClientSession) -> bool:
+    """Check health, inject sample data and verify the read endpoints (False if aborted early)."""
     # Wait for API to be ready
     print("\n1. Checking API health...")
     try:
-        response = requests.get(f"{API_URL}/health", timeout=5)
-        if response.status_code == 200:
+        status, health_data = await _get_json(session, "/health")
+        if status == 200:
             print("   ✅ API is running")
-            health_data = response.json()
             print(f"   Status: {health_data.get('status')}")
         else:
-            print(f"   ❌ API returned status {response.status_code}")
-            return
-    except requests.exceptions.ConnectionError:
+            print(f"   ❌ API returned status {status}")
+            return False
+    except aiohttp.ClientConnectionError:
         print("   ❌ Cannot connect to API. Make sure the backend is running.")
         print("   Run: cd backend && python run.py")
-        return
+        return False
     except Exception as e:
         print(f"   ❌ Error: {e}")
-        return
+        return False
     
     # Inject sample data
     print("\n2. Injecting sample data...")
     try:
-        payload = {
-            "cloudtrail_events_count": 15,
-            "cost_anomalies_count": 8,
-            "clear_existing": True
-        }
-        response = requests.post(
-            f"{API_URL}/api/test/inject-sample-data",
-            json=payload,
-            timeout=10
-        )
+        results = await _inject_in_batches(session, cloudtrail_events_count=15, cost_anomalies_count=8)
+        for status, body in results:
+            if status != 200:
+                print(f"   ❌ Failed to inject data: {status}")
+                print(f"   Response: {body}")
+                return False
         
-        if response.status_code == 200:
-            data = response.json()
-            print("   ✅ Sample data injected successfully")
-            print(f"   - CloudTrail events: {data.get('cloudtrail_events_injected')}")
-            print(f"   - Cost anomalies: {data.get('cost_anomalies_injected')}")
-            print(f"   - Total events: {data.get('total_cloudtrail_events')}")
-            print(f"   - Total anomalies: {data.get('total_cost_anomalies')}")
-        else:
-            print(f"   ❌ Failed to inject data: {response.status_code}")
-            print(f"   Response: {response.text}")
-            return
+        # Totals grow with each batch; the largest is the final count
+        responses = [body for _, body in results]
+        print("   ✅ Sample data injected successfully")
+        print(f"   - CloudTrail events: {sum(data.get('cloudtrail_events_injected', 0) for data in responses)}")
+        print(f"   - Cost anomalies: {sum(data.get('cost_anomalies_injected', 0) for data in responses)}")
+        print(f"   - Total events: {max(data.get('total_cloudtrail_events', 0) for data in responses)}")
+        print(f"   - Total anomalies: {max(data.get('total_cost_anomalies', 0) for data in responses)}")
     except Exception as e:
         print(f"   ❌ Error injecting data: {e}")
-        return
+        return False
+    
+    # The remaining checks are independent reads, so issue them concurrently
+    # and report the results in order
+    stats_result, events_result, anomalies_result, agents_result = await asyncio.gather(
+        _get_json(session, "/api/dashboard/stats"),
+        _get_json(session, "/api/cloudtrail/events?limit=5"),
+        _get_json(session, "/api/cost/anomalies?limit=5"),
+        _get_json(session, "/api/agents"),
+        return_exceptions=True
+    )
     
     # Check dashboard stats
     print("\n3. Checking dashboard statistics...")
     try:
-        response = requests.get(f"{API_URL}/api/dashboard/stats", timeout=5)
-        if response.status_code == 200:
-            stats = response.json()
+        if isinstance(stats_result, Exception):
+            raise stats_result
+        status, stats = stats_result
+        if status == 200:
             print("   ✅ Dashboard stats retrieved")
             print(f"   - CloudTrail events: {stats.get('cloudtrail', {}).get('suspicious_events', 0)}")
             print(f"   - Cost anomalies: {stats.get('cost', {}).get('anomalies', 0)}")
             print(f"   - CloudTrail running: {stats.get('cloudtrail', {}).get('running', False)}")
             print(f"   - Cost running: {stats.get('cost', {}).get('running', False)}")
         else:
-            print(f"   ❌ Failed to get stats: {response.status_code}")
+            print(f"   ❌ Failed to get stats: {status}")
     except Exception as e:
         print(f"   ❌ Error getting stats: {e}")
     
     # Check CloudTrail events
     print("\n4. Checking CloudTrail events...")
     try:
-        response = requests.get(f"{API_URL}/api/cloudtrail/events?limit=5", timeout=5)
-        if response.status_code == 200:
-            data = response.json()
+        if isinstance(events_result, Exception):
+            raise events_result
+        status, data = events_result
+        if status == 200:
             events = data.get('events', [])
             print(f"   ✅ Retrieved {len(events)} events")
             if events:
@@ -93,16 +199,17 @@ def test_inject_sample_data():
                 for i, event in enumerate(events[:3], 1):
                     print(f"   {i}. {event.get('event_name', 'Unknown')} - {event.get('event_time', 'N/A')}")
         else:
-            print(f"   ❌ Failed to get events: {response.status_code}")
+            print(f"   ❌ Failed to get events: {status}")
     except Exception as e:
         print(f"   ❌ Error getting events: {e}")
     
     # Check cost anomalies
     print("\n5. Checking cost anomalies...")
     try:
-        response = requests.get(f"{API_URL}/api/cost/anomalies?limit=5", timeout=5)
-        if response.status_code == 200:
-            data = response.json()
+        if isinstance(anomalies_result, Exception):
+            raise anomalies_result
+        status, data = anomalies_result
+        if status == 200:
             anomalies = data.get('anomalies', [])
             print(f"   ✅ Retrieved {len(anomalies)} anomalies")
             if anomalies:
@@ -111,16 +218,17 @@ def test_inject_sample_data():
                     impact = anomaly.get('impact', {}).get('TotalImpact', {}).get('Amount', '0')
                     print(f"   {i}. {anomaly.get('dimension_value', 'Unknown')} - ${impact}")
         else:
-            print(f"   ❌ Failed to get anomalies: {response.status_code}")
+            print(f"   ❌ Failed to get anomalies: {status}")
     except Exception as e:
         print(f"   ❌ Error getting anomalies: {e}")
     
     # Check agent status
     print("\n6. Checking agent status...")
     try:
-        response = requests.get(f"{API_URL}/api/agents", timeout=5)
-        if response.status_code == 200:
-            data = response.json()
+        if isinstance(agents_result, Exception):
+            raise agents_result
+        status, data = agents_result
+        if status == 200:
             print("   ✅ Agent status retrieved")
             agents = data.get('agents', {}).get('agents', {})
             for agent_name, agent_status in agents.items():
@@ -128,21 +236,13 @@ def test_inject_sample_data():
                 status_icon = "✅" if running else "❌"
                 print(f"   {status_icon} {agent_name}: {'Running' if running else 'Stopped'}")
         else:
-            print(f"   ❌ Failed to get agent status: {response.status_code}")
+            print(f"   ❌ Failed to get agent status: {status}")
     except Exception as e:
         print(f"   ❌ Error getting agent status: {e}")
     
-    print("\n" + "=" * 60)
-    print("Test Complete!")
-    print("=" * 60)
-    print("\nNext steps:")
-    print("1. Open http://localhost:3000 in your browser to view the dashboard")
-    print("2. The dashboard should show the injected sample data")
-    print("3. Try injecting more data: POST /api/test/inject-sample-data")
-    print("4. Clear data: POST /api/test/clear-all-data")
+    return True
 
 
 if __name__ == "__main__":
     print("\nWaiting for API to be ready...")
-    time.sleep(2)  # Give API a moment to start
-    test_inject_sample_data()
+    asyncio.run(test_inject_sample_data())
@@ -1,12 +1,54 @@
 """Alerting and notification tools."""
 from datetime import datetime
 from typing import List, Dict, Optional
-import boto3
+import asyncio
+import logging
+import concurrent.futures
 from botocore.exceptions import ClientError
 import aiohttp
 import json
 from strands_agents import tool
 from config import settings
+from utils.aws_clients import get_client
+
+logger = logging.getLogger(__name__)
+
+# SES accepts at most 50 destination addresses per message
+SES_MAX_RECIPIENTS = 50
+
+# Upper bound on recipient chunks sent to SES at once
+SES_MAX_CONCURRENT_SENDS = 8
+
+# Bound on a single Slack webhook request, so a slow webhook can't stall alert delivery
+SLACK_TIMEOUT_SECONDS = 5
+
+# Slack webhook session shared by all alerts so keep-alive connections are
+# reused, and the event loop it belongs to (sessions can't cross loops)
+_slack_session: Optional[aiohttp.ClientSession] = None
+_slack_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_slack_session() -> aiohttp.ClientSession:
+    """Return the shared Slack session, creating it on first use in the running loop."""
+    global _slack_session, _slack_session_loop
+    loop = asyncio.get_running_loop()
+    # Creation is synchronous, so no other coroutine can race it
+    if _slack_session is None or _slack_session.closed or _slack_session_loop is not loop:
+        _slack_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300, keepalive_timeout=60),
+            timeout=aiohttp.ClientTimeout(total=SLACK_TIMEOUT_SECONDS)
+        )
+        _slack_session_loop = loop
+    return _slack_session
+
+
+async def close_slack_session():
+    """Close the shared Slack session; call on shutdown, once alerts are flushed."""
+    global _slack_session, _slack_session_loop
+    if _slack_session is not None and _slack_session_loop is asyncio.get_running_loop():
+        await _slack_session.close()
+    _slack_session = None
+    _slack_session_loop = None
 
 
 @tool
@@ -29,7 +71,7 @@ def send_sns_notification(
         Message ID
     """
     try:
-        sns_client = boto3.client('sns', region_name=settings.aws_region)
+        sns_client = get_client('sns')
         topic = topic_arn or settings.sns_topic_arn
         
         if not topic:
@@ -48,10 +90,10 @@ def send_sns_notification(
         return response.get('MessageId', '')
     
     except ClientError as e:
-        print(f"AWS Error sending SNS notification: {e}")
+        logger.error("AWS Error sending SNS notification: %s", e)
         return ""
     except Exception as e:
-        print(f"Error sending SNS notification: {e}")
+        logger.error("Error sending SNS notification: %s", e)
         return ""
 
 
@@ -78,7 +120,7 @@ async def send_slack_alert(
         webhook = webhook_url or settings.slack_webhook_url
         
         if not webhook:
-            print("No Slack webhook URL configured")
+            logger.warning("No Slack webhook URL configured")
             return False
         
         # Color coding based on severity
@@ -104,12 +146,11 @@ async def send_slack_alert(
             ]
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(webhook, json=payload) as response:
-                return response.status == 200
+        async with _get_slack_session().post(webhook, json=payload) as response:
+            return response.status == 200
     
     except Exception as e:
-        print(f"Error sending Slack alert: {e}")
+        logger.error("Error sending Slack alert: %s", e)
         return False
 
 
@@ -118,40 +159,59 @@ def send_email_alert(
     recipients: List[str],
     subject: str,
     body: str,
-    attachments: Optional[List[str]] = None
+    attachments: Optional[List[str]] = None,
+    html_body: Optional[str] = None
 ) -> bool:
     """
-    Sends email alert via AWS SES.
+    Sends email alert via AWS SES. Recipients beyond SES's per-message limit
+    are split into chunks that are sent concurrently.
     
     Args:
         recipients: List of email addresses
         subject: Email subject
         body: Email body (HTML or plain text)
         attachments: Optional list of file paths to attach
+        html_body: Optional pre-rendered HTML body; defaults to body with
+            line breaks converted to <br>
     
     Returns:
-        True if successful, False otherwise
+        True if every chunk was sent successfully, False otherwise
     """
     try:
-        ses_client = boto3.client('ses', region_name=settings.aws_region)
+        if not recipients:
+            logger.warning("No email recipients given")
+            return False
         
-        response = ses_client.send_email(
-            Source=settings.email_from,
-            Destination={'ToAddresses': recipients},
-            Message={
-                'Subject': {'Data': subject, 'Charset': 'UTF-8'},
-                'Body': {
-                    'Text': {'Data': body, 'Charset': 'UTF-8'},
-                    'Html': {'Data': body.replace('\n', '<br>'), 'Charset': 'UTF-8'}
-                }
+        ses_client = get_client('ses')
+        if html_body is None:
+            html_body = body.replace('\n', '<br>')
+        message = {
+            'Subject': {'Data': subject, 'Charset': 'UTF-8'},
+            'Body': {
+                'Text': {'Data': body, 'Charset': 'UTF-8'},
+                'Html': {'Data': html_body, 'Charset': 'UTF-8'}
             }
-        )
+        }
+        
+        def send(chunk: List[str]) -> bool:
+            response = ses_client.send_email(
+                Source=settings.email_from,
+                Destination={'ToAddresses': chunk},
+                Message=message
+            )
+            return response.get('MessageId') is not None
+        
+        chunks = [recipients[i:i + SES_MAX_RECIPIENTS] for i in range(0, len(recipients), SES_MAX_RECIPIENTS)]
+        if len(chunks) == 1:
+            return send(chunks[0])
         
-        return response.get('MessageId') is not None
+        # Each send is an independent network round trip, so overlap them
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(chunks), SES_MAX_CONCURRENT_SENDS)) as pool:
+            return all(pool.map(send, chunks))
     
     except ClientError as e:
-        print(f"AWS Error sending email: {e}")
+        logger.error("AWS Error sending email: %s", e)
         return False
     except Exception as e:
-        print(f"Error sending email: {e}")
+        logger.error("Error sending email: %s", e)
         return False
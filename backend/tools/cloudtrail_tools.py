@@ -1,12 +1,39 @@
 """CloudTrail integration tools for monitoring AWS activity."""
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
-import boto3
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Dict, Optional, Tuple
+import concurrent.futures
+import logging
 from botocore.exceptions import ClientError
-import json
-import gzip
+import orjson
+try:
+    # ISA-L inflates gzip several times faster than zlib, with the same API
+    from isal import igzip as gzip
+except ImportError:
+    import gzip
+try:
+    # Incremental JSON parser, so filtered fetches never hold a whole log file
+    import ijson
+except ImportError:
+    ijson = None
 from strands_agents import tool
 from config import settings
+from utils.aws_clients import get_client
+from utils.log_cache import cached_log_events
+
+logger = logging.getLogger(__name__)
+
+# Log files downloaded in parallel per fetch; S3 reads are I/O bound, so
+# threads overlap network waits (the shared client's pool has room for all)
+S3_DOWNLOAD_WORKERS = 32
+
+# Downloads queued or in flight before the stream waits for one to finish
+S3_MAX_PENDING_DOWNLOADS = 2 * S3_DOWNLOAD_WORKERS
+
+# Per-day log prefixes listed in parallel per fetch
+S3_LIST_WORKERS = 8
+
+# How far back CloudTrail LookupEvents can query management events
+LOOKUP_EVENTS_WINDOW = timedelta(days=90)
 
 
 @tool
@@ -28,69 +55,283 @@ def fetch_cloudtrail_logs(
     Returns:
         List of CloudTrail events
     """
+    events = []
+    for page in fetch_cloudtrail_logs_stream(start_time, end_time, account_id, event_name):
+        events.extend(page)
+    return events
+
+
+@tool
+def fetch_cloudtrail_logs_stream(
+    start_time: str,
+    end_time: str,
+    account_id: Optional[str] = None,
+    event_name: Optional[str] = None
+) -> Iterator[List[Dict]]:
+    """
+    Streams CloudTrail logs from S3 bucket one log file at a time.
+    Log files are downloaded and parsed concurrently, so pages arrive in
+    completion order rather than key order.
+    
+    Args:
+        start_time: Start time in ISO format (e.g., '2024-01-01T00:00:00Z')
+        end_time: End time in ISO format (e.g., '2024-01-01T23:59:59Z')
+        account_id: Optional AWS account ID to filter by
+        event_name: Optional event name to filter by (e.g., 'RunInstances')
+    
+    Yields:
+        Lists of CloudTrail events, one list per log file in the time range
+    """
     try:
-        s3_client = boto3.client('s3', region_name=settings.aws_region)
-        events = []
+        s3_client = get_client('s3')
         
         # Parse time range
-        start_dt = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-        end_dt = datetime.fromisoformat(end_time.replace('Z', '+00:00'))
+        start_dt = _as_utc(datetime.fromisoformat(start_time.replace('Z', '+00:00')))
+        end_dt = _as_utc(datetime.fromisoformat(end_time.replace('Z', '+00:00')))
         
-        # List objects in S3 bucket for the time range
-        prefix = settings.cloudtrail_log_prefix
-        paginator = s3_client.get_paginator('list_objects_v2')
+        # CloudTrail indexes recent events by name, so such queries skip
+        # listing, downloading and parsing log files entirely
+        if settings.cloudtrail_lookup_events and event_name and _within_lookup_window(start_dt):
+            for events in _lookup_log_events(start_dt, end_dt, account_id, event_name):
+                events = _in_time_range(events, start_dt, end_dt)
+                if events:
+                    yield events
+            return
         
-        for page in paginator.paginate(Bucket=settings.cloudtrail_s3_bucket, Prefix=prefix):
-            if 'Contents' not in page:
-                continue
-                
-            for obj in page['Contents']:
-                # Parse date from object key (CloudTrail format: YYYY/MM/DD/account_id_CloudTrail_region_YYYYMMDDTHHmmssZ_hash.json.gz)
-                try:
-                    key_parts = obj['Key'].split('/')
-                    if len(key_parts) >= 4:
-                        obj_date_str = f"{key_parts[1]}-{key_parts[2]}-{key_parts[3]}"
-                        obj_date = datetime.strptime(obj_date_str, '%Y-%m-%d')
-                        
-                        # Check if object is in time range
-                        if start_dt.date() <= obj_date.date() <= end_dt.date():
-                            # Download and parse log file
-                            response = s3_client.get_object(
-                                Bucket=settings.cloudtrail_s3_bucket,
-                                Key=obj['Key']
-                            )
-                            
-                            # Decompress if gzipped
-                            content = response['Body'].read()
-                            if obj['Key'].endswith('.gz'):
-                                content = gzip.decompress(content)
-                            
-                            log_data = json.loads(content.decode('utf-8'))
-                            
-                            # Extract events
-                            if 'Records' in log_data:
-                                for record in log_data['Records']:
-                                    # Apply filters
-                                    if account_id and record.get('userIdentity', {}).get('accountId') != account_id:
-                                        continue
-                                    if event_name and record.get('eventName') != event_name:
-                                        continue
-                                    
-                                    events.append(record)
-                except Exception as e:
-                    print(f"Error processing object {obj['Key']}: {e}")
+        # Keys are listed lazily while earlier files download; at most
+        # S3_MAX_PENDING_DOWNLOADS downloads are queued or running at once
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=S3_DOWNLOAD_WORKERS)
+        try:
+            pending = set()
+            # Objects already scheduled in this fetch, by ETag (or key when S3
+            # omits it), so a repeated listing or a duplicate delivery of the
+            # same log file is only downloaded and inflated once
+            scheduled = set()
+            for key, etag in _log_objects_in_range(s3_client, start_dt, end_dt):
+                object_id = etag or key
+                if object_id in scheduled:
                     continue
-        
-        return events
+                scheduled.add(object_id)
+                pending.add(executor.submit(_load_log_events, s3_client, key, etag, account_id, event_name))
+                if len(pending) < S3_MAX_PENDING_DOWNLOADS:
+                    continue
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    events = _in_time_range(future.result(), start_dt, end_dt)
+                    if events:
+                        yield events
+            
+            for future in concurrent.futures.as_completed(pending):
+                events = _in_time_range(future.result(), start_dt, end_dt)
+                if events:
+                    yield events
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
     
     except ClientError as e:
-        print(f"AWS Error fetching CloudTrail logs: {e}")
-        return []
+        logger.error("AWS Error fetching CloudTrail logs: %s", e)
     except Exception as e:
-        print(f"Error fetching CloudTrail logs: {e}")
+        logger.error("Error fetching CloudTrail logs: %s", e)
+
+
+def _within_lookup_window(start_dt: datetime) -> bool:
+    """Check whether LookupEvents still holds events from start_dt onwards (naive times are UTC)."""
+    return _as_utc(start_dt) >= datetime.now(timezone.utc) - LOOKUP_EVENTS_WINDOW
+
+
+def _as_utc(dt: datetime) -> datetime:
+    """Treat a naive datetime as UTC."""
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _in_time_range(events: List[Dict], start_dt: datetime, end_dt: datetime) -> List[Dict]:
+    """Keep the events whose eventTime falls within [start_dt, end_dt)."""
+    # A day's log files hold events from the whole day, so records outside
+    # the requested window are dropped here rather than returned again by
+    # every fetch that touches the same day
+    kept = []
+    parsed_times = {}
+    for event in events:
+        event_time_str = event.get('eventTime')
+        event_time = parsed_times.get(event_time_str)
+        if event_time is None:
+            try:
+                event_time = parsed_times[event_time_str] = _as_utc(
+                    datetime.fromisoformat(event_time_str.replace('Z', '+00:00'))
+                )
+            except (AttributeError, TypeError, ValueError):
+                continue
+        if start_dt <= event_time < end_dt:
+            kept.append(event)
+    return kept
+
+
+def _lookup_log_events(
+    start_dt: datetime,
+    end_dt: datetime,
+    account_id: Optional[str],
+    event_name: str
+) -> Iterator[List[Dict]]:
+    """Yield matching events from CloudTrail LookupEvents, one list per result page."""
+    paginator = get_client('cloudtrail').get_paginator('lookup_events')
+    pages = paginator.paginate(
+        LookupAttributes=[{'AttributeKey': 'EventName', 'AttributeValue': event_name}],
+        StartTime=start_dt,
+        EndTime=end_dt
+    )
+    
+    for page in pages:
+        # Each result carries the full log record as a JSON string
+        events = [orjson.loads(result['CloudTrailEvent']) for result in page.get('Events', [])]
+        if account_id:
+            events = [
+                event for event in events
+                if event.get('userIdentity', {}).get('accountId') == account_id
+            ]
+        if events:
+            yield events
+
+
+def _log_objects_in_range(s3_client, start_dt: datetime, end_dt: datetime) -> Iterator[Tuple[str, Optional[str]]]:
+    """List the (key, ETag) of CloudTrail log files whose date falls within the time range."""
+    # Log files are stored under prefix/YYYY/MM/DD/, so list only the day
+    # prefixes in range instead of every object in the bucket
+    prefix = settings.cloudtrail_log_prefix
+    if prefix and not prefix.endswith('/'):
+        prefix += '/'
+    start_date = start_dt.date()
+    day_prefixes = [
+        f"{prefix}{start_date + timedelta(days=i):%Y/%m/%d}/"
+        for i in range((end_dt.date() - start_date).days + 1)
+    ]
+    
+    if len(day_prefixes) == 1:
+        yield from _list_log_objects(s3_client, day_prefixes[0])
+        return
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(day_prefixes), S3_LIST_WORKERS)) as executor:
+        for objects in executor.map(lambda day_prefix: _list_log_objects(s3_client, day_prefix), day_prefixes):
+            yield from objects
+
+
+def _list_log_objects(s3_client, day_prefix: str) -> List[Tuple[str, Optional[str]]]:
+    """List the (key, ETag) of every log file under one day's prefix."""
+    paginator = s3_client.get_paginator('list_objects_v2')
+    return [
+        (obj['Key'], obj.get('ETag'))
+        for page in paginator.paginate(Bucket=settings.cloudtrail_s3_bucket, Prefix=day_prefix)
+        for obj in page.get('Contents', [])
+    ]
+
+
+def _load_log_events(
+    s3_client,
+    key: str,
+    etag: Optional[str],
+    account_id: Optional[str],
+    event_name: Optional[str]
+) -> List[Dict]:
+    """Load one CloudTrail log file's matching events, from the local cache when enabled (runs in a download worker)."""
+    try:
+        # Log files are immutable once delivered, so overlapping time windows
+        # can reuse the events parsed for the same object version
+        if settings.cloudtrail_log_cache_dir and etag:
+            return cached_log_events(
+                settings.cloudtrail_log_cache_dir,
+                (settings.cloudtrail_s3_bucket, key, etag, account_id, event_name),
+                lambda: _fetch_log_events(s3_client, key, account_id, event_name)
+            )
+        return _fetch_log_events(s3_client, key, account_id, event_name)
+    except Exception as e:
+        logger.error("Error processing object %s: %s", key, e)
         return []
 
 
+def _fetch_log_events(
+    s3_client,
+    key: str,
+    account_id: Optional[str],
+    event_name: Optional[str]
+) -> List[Dict]:
+    """Download, decompress and filter one CloudTrail log file."""
+    # Let S3 filter selective queries server-side so only matching records are transferred
+    if settings.cloudtrail_s3_select and (account_id or event_name):
+        try:
+            return _select_log_events(s3_client, key, account_id, event_name)
+        except ClientError as e:
+            logger.warning("S3 Select unavailable for %s, downloading instead: %s", key, e)
+    
+    # Download and parse log file
+    response = s3_client.get_object(
+        Bucket=settings.cloudtrail_s3_bucket,
+        Key=key
+    )
+    
+    # Inflate while reading the body, rather than buffering the compressed file first
+    stream = response['Body']
+    if key.endswith('.gz'):
+        stream = gzip.GzipFile(fileobj=stream, mode='rb')
+    
+    # Filtered fetches keep few records, so parse them one at a time and
+    # drop non-matching ones; unfiltered fetches keep every record, where a
+    # single orjson parse of the document is faster
+    if ijson is not None and (account_id or event_name):
+        records = ijson.items(stream, 'Records.item', use_float=True)
+    else:
+        records = orjson.loads(stream.read()).get('Records', [])
+    
+    # Extract events
+    events = []
+    for record in records:
+        # Apply filters
+        if account_id and record.get('userIdentity', {}).get('accountId') != account_id:
+            continue
+        if event_name and record.get('eventName') != event_name:
+            continue
+        
+        events.append(record)
+    return events
+
+
+def _sql_literal(value: str) -> str:
+    """Quote a value as an S3 Select string literal."""
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _select_log_events(
+    s3_client,
+    key: str,
+    account_id: Optional[str],
+    event_name: Optional[str]
+) -> List[Dict]:
+    """Fetch only the records of one log file that match the filters, using S3 Select."""
+    conditions = []
+    if account_id:
+        conditions.append(f"r.userIdentity.accountId = {_sql_literal(account_id)}")
+    if event_name:
+        conditions.append(f"r.eventName = {_sql_literal(event_name)}")
+    
+    response = s3_client.select_object_content(
+        Bucket=settings.cloudtrail_s3_bucket,
+        Key=key,
+        ExpressionType='SQL',
+        Expression=f"SELECT * FROM S3Object[*].Records[*] r WHERE {' AND '.join(conditions)}",
+        InputSerialization={
+            'JSON': {'Type': 'DOCUMENT'},
+            'CompressionType': 'GZIP' if key.endswith('.gz') else 'NONE'
+        },
+        OutputSerialization={'JSON': {'RecordDelimiter': '\n'}}
+    )
+    
+    # Payload chunks can split a record, so join them before splitting lines
+    payload = b"".join(
+        stream_event['Records']['Payload']
+        for stream_event in response['Payload']
+        if 'Records' in stream_event
+    )
+    return [orjson.loads(line) for line in payload.splitlines() if line]
+
+
 @tool
 def analyze_cloudtrail_insights(
     insight_type: str = "ApiCallRateInsight",
@@ -107,7 +348,7 @@ def analyze_cloudtrail_insights(
         Dictionary containing insight results
     """
     try:
-        cloudtrail_client = boto3.client('cloudtrail', region_name=settings.aws_region)
+        cloudtrail_client = get_client('cloudtrail')
         
         # Calculate time range
         end_time = datetime.utcnow()
@@ -137,10 +378,10 @@ def analyze_cloudtrail_insights(
         }
     
     except ClientError as e:
-        print(f"AWS Error analyzing CloudTrail insights: {e}")
+        logger.error("AWS Error analyzing CloudTrail insights: %s", e)
         return {"error": str(e)}
     except Exception as e:
-        print(f"Error analyzing CloudTrail insights: {e}")
+        logger.error("Error analyzing CloudTrail insights: %s", e)
         return {"error": str(e)}
 
 
@@ -156,32 +397,36 @@ def parse_cloudtrail_event(event: Dict) -> Dict:
         Parsed event with structured data
     """
     try:
+        # Look up userIdentity once rather than once per identity field
+        get = event.get
+        identity = get("userIdentity", {})
+        identity_get = identity.get
         parsed = {
-            "event_id": event.get("eventID", ""),
-            "event_time": event.get("eventTime", ""),
-            "event_name": event.get("eventName", ""),
-            "event_source": event.get("eventSource", ""),
-            "aws_region": event.get("awsRegion", ""),
-            "source_ip": event.get("sourceIPAddress", ""),
-            "user_agent": event.get("userAgent", ""),
+            "event_id": get("eventID", ""),
+            "event_time": get("eventTime", ""),
+            "event_name": get("eventName", ""),
+            "event_source": get("eventSource", ""),
+            "aws_region": get("awsRegion", ""),
+            "source_ip": get("sourceIPAddress", ""),
+            "user_agent": get("userAgent", ""),
             "user_identity": {
-                "type": event.get("userIdentity", {}).get("type", ""),
-                "principal_id": event.get("userIdentity", {}).get("principalId", ""),
-                "arn": event.get("userIdentity", {}).get("arn", ""),
-                "account_id": event.get("userIdentity", {}).get("accountId", ""),
-                "user_name": event.get("userIdentity", {}).get("userName", "")
+                "type": identity_get("type", ""),
+                "principal_id": identity_get("principalId", ""),
+                "arn": identity_get("arn", ""),
+                "account_id": identity_get("accountId", ""),
+                "user_name": identity_get("userName", "")
             },
-            "resources": event.get("resources", []),
-            "request_parameters": event.get("requestParameters", {}),
-            "response_elements": event.get("responseElements", {}),
-            "error_code": event.get("errorCode"),
-            "error_message": event.get("errorMessage"),
-            "read_only": event.get("readOnly", False),
-            "management_event": event.get("managementEvent", True)
+            "resources": get("resources", []),
+            "request_parameters": get("requestParameters", {}),
+            "response_elements": get("responseElements", {}),
+            "error_code": get("errorCode"),
+            "error_message": get("errorMessage"),
+            "read_only": get("readOnly", False),
+            "management_event": get("managementEvent", True)
         }
         
         return parsed
     
     except Exception as e:
-        print(f"Error parsing CloudTrail event: {e}")
+        logger.error("Error parsing CloudTrail event: %s", e)
         return {"error": str(e), "raw_event": event}
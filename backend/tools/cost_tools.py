@@ -1,10 +1,18 @@
 """Cost Anomaly Detection tools for monitoring AWS spending."""
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
-import boto3
+import concurrent.futures
+import logging
 from botocore.exceptions import ClientError
 from strands_agents import tool
 from config import settings
+from utils.aws_clients import get_client
+
+logger = logging.getLogger(__name__)
+
+# Monitors queried in parallel per call; each query is a network round trip
+# (the shared Cost Explorer client's pool has room for all of them)
+CE_MAX_CONCURRENT_MONITORS = 16
 
 
 @tool
@@ -25,8 +33,7 @@ def get_cost_anomalies(
         List of cost anomalies with root causes and recommended actions
     """
     try:
-        ce_client = boto3.client('ce', region_name=settings.aws_region)
-        anomalies = []
+        ce_client = get_client('ce')
         
         # Default to last 30 days if not specified
         if not end_date:
@@ -39,46 +46,66 @@ def get_cost_anomalies(
             monitors = [{"MonitorArn": monitor_arn}]
         else:
             # List all monitors
-            monitors_response = ce_client.list_anomaly_monitors()
-            monitors = monitors_response.get('AnomalyMonitors', [])
-        
-        # Get anomalies for each monitor
-        for monitor in monitors:
-            monitor_arn = monitor.get('MonitorArn', '')
-            
-            try:
-                response = ce_client.list_anomalies_for_monitor(
-                    MonitorArn=monitor_arn,
-                    DateInterval={
-                        'Start': start_date,
-                        'End': end_date
-                    }
-                )
-                
-                for anomaly in response.get('Anomalies', []):
-                    anomaly_detail = {
-                        "anomaly_id": anomaly.get('AnomalyId', ''),
-                        "anomaly_score": anomaly.get('AnomalyScore', {}),
-                        "impact": anomaly.get('Impact', {}),
-                        "root_cause": anomaly.get('RootCauses', []),
-                        "monitor_arn": monitor_arn,
-                        "dimension_value": anomaly.get('DimensionValue', ''),
-                        "feedback": anomaly.get('Feedback'),
-                        "status": anomaly.get('Status', '')
-                    }
-                    anomalies.append(anomaly_detail)
-            
-            except ClientError as e:
-                print(f"Error getting anomalies for monitor {monitor_arn}: {e}")
-                continue
+            paginator = ce_client.get_paginator('get_anomaly_monitors')
+            monitors = [
+                monitor
+                for page in paginator.paginate()
+                for monitor in page.get('AnomalyMonitors', [])
+            ]
         
-        return anomalies
+        monitor_arns = [monitor.get('MonitorArn', '') for monitor in monitors]
+        if len(monitor_arns) <= 1:
+            per_monitor = [_monitor_anomalies(ce_client, arn, start_date, end_date) for arn in monitor_arns]
+        else:
+            # Query monitors concurrently so the total wait is the slowest
+            # monitor rather than the sum of all of them
+            with concurrent.futures.ThreadPoolExecutor(
+                max_workers=min(len(monitor_arns), CE_MAX_CONCURRENT_MONITORS)
+            ) as executor:
+                per_monitor = list(executor.map(
+                    lambda arn: _monitor_anomalies(ce_client, arn, start_date, end_date),
+                    monitor_arns
+                ))
+        
+        return [anomaly for anomalies in per_monitor for anomaly in anomalies]
     
     except ClientError as e:
-        print(f"AWS Error getting cost anomalies: {e}")
+        logger.error("AWS Error getting cost anomalies: %s", e)
         return []
     except Exception as e:
-        print(f"Error getting cost anomalies: {e}")
+        logger.error("Error getting cost anomalies: %s", e)
+        return []
+
+
+def _monitor_anomalies(ce_client, monitor_arn: str, start_date: str, end_date: str) -> List[Dict]:
+    """Fetch every page of one monitor's anomalies (runs in a worker thread)."""
+    try:
+        paginator = ce_client.get_paginator('get_anomalies')
+        pages = paginator.paginate(
+            MonitorArn=monitor_arn,
+            DateInterval={
+                'Start': start_date,
+                'End': end_date
+            }
+        )
+        
+        return [
+            {
+                "anomaly_id": anomaly.get('AnomalyId', ''),
+                "anomaly_score": anomaly.get('AnomalyScore', {}),
+                "impact": anomaly.get('Impact', {}),
+                "root_cause": anomaly.get('RootCauses', []),
+                "monitor_arn": monitor_arn,
+                "dimension_value": anomaly.get('DimensionValue', ''),
+                "feedback": anomaly.get('Feedback'),
+                "status": anomaly.get('Status', '')
+            }
+            for page in pages
+            for anomaly in page.get('Anomalies', [])
+        ]
+    
+    except ClientError as e:
+        logger.error("Error getting anomalies for monitor %s: %s", monitor_arn, e)
         return []
 
 
@@ -102,7 +129,7 @@ def configure_cost_monitor(
         Monitor ARN
     """
     try:
-        ce_client = boto3.client('ce', region_name=settings.aws_region)
+        ce_client = get_client('ce')
         
         # Build monitor specification
         monitor_spec = {
@@ -141,10 +168,10 @@ def configure_cost_monitor(
         return monitor_arn
     
     except ClientError as e:
-        print(f"AWS Error configuring cost monitor: {e}")
+        logger.error("AWS Error configuring cost monitor: %s", e)
         return ""
     except Exception as e:
-        print(f"Error configuring cost monitor: {e}")
+        logger.error("Error configuring cost monitor: %s", e)
         return ""
 
 
@@ -160,7 +187,7 @@ def analyze_cost_anomaly(anomaly_id: str) -> Dict:
         Detailed analysis including root cause, impact, and recommendations
     """
     try:
-        ce_client = boto3.client('ce', region_name=settings.aws_region)
+        ce_client = get_client('ce')
         
         # Get anomaly details
         # Note: AWS Cost Explorer API doesn't have a direct get_anomaly endpoint
@@ -200,8 +227,8 @@ def analyze_cost_anomaly(anomaly_id: str) -> Dict:
         return analysis
     
     except ClientError as e:
-        print(f"AWS Error analyzing cost anomaly: {e}")
+        logger.error("AWS Error analyzing cost anomaly: %s", e)
         return {"error": str(e)}
     except Exception as e:
-        print(f"Error analyzing cost anomaly: {e}")
+        logger.error("Error analyzing cost anomaly: %s", e)
         return {"error": str(e)}
@@ -1,13 +1,32 @@
 """Sample data tools for testing (mock AWS tools)."""
-from typing import List, Dict, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 import random
+import time
 from strands_agents import tool
 from utils.sample_data import (
     generate_sample_cloudtrail_events,
     generate_sample_cost_anomalies
 )
 
+# Samples generated up front per kind; each mock call draws a few from the pool
+SAMPLE_POOL_SIZE = {"cloudtrail": 10_000, "cost": 1_000}
+
+# Sample timestamps are relative to generation time, so pools are rebuilt once this old
+SAMPLE_POOL_MAX_AGE_SECONDS = 600
+
+_sample_pools: Dict[str, Tuple[float, Tuple[Dict, ...]]] = {}  # kind -> (built at, samples)
+
+
+def _sample_pool(kind: str, generate: Callable[[int], List[Dict]]) -> Tuple[Dict, ...]:
+    """Return the pre-generated samples of a kind, regenerating them when stale."""
+    now = time.monotonic()
+    built_at, pool = _sample_pools.get(kind, (0.0, ()))
+    if not pool or now - built_at > SAMPLE_POOL_MAX_AGE_SECONDS:
+        pool = tuple(generate(SAMPLE_POOL_SIZE[kind]))
+        _sample_pools[kind] = (now, pool)
+    return pool
+
 
 @tool
 def fetch_cloudtrail_logs_sample(
@@ -19,14 +38,17 @@ def fetch_cloudtrail_logs_sample(
     """
     Mock version of fetch_cloudtrail_logs that returns sample data.
     Use this for testing when AWS credentials are not available.
+    Events are shared with the sample pool, so treat them as read-only.
     """
-    # Generate sample events
-    events = generate_sample_cloudtrail_events(count=random.randint(5, 15))
+    # Draw sample events from the pre-generated pool
+    events = random.sample(_sample_pool("cloudtrail", generate_sample_cloudtrail_events), random.randint(5, 15))
     
-    # Apply filters if provided
+    # Apply filters if provided; overridden events are copies, leaving the pool intact
     if account_id:
-        for event in events:
-            event["userIdentity"]["accountId"] = account_id
+        events = [
+            {**event, "userIdentity": {**event["userIdentity"], "accountId": account_id}}
+            for event in events
+        ]
     
     if event_name:
         events = [e for e in events if e.get("eventName") == event_name]
@@ -43,5 +65,6 @@ def get_cost_anomalies_sample(
     """
     Mock version of get_cost_anomalies that returns sample data.
     Use this for testing when AWS credentials are not available.
+    Anomalies are shared with the sample pool, so treat them as read-only.
     """
-    return generate_sample_cost_anomalies(count=random.randint(3, 8))
+    return random.sample(_sample_pool("cost", generate_sample_cost_anomalies), random.randint(3, 8))
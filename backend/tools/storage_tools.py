@@ -0,0 +1,91 @@
+"""Persistence tools for alert and anomaly history."""
+from datetime import datetime, timezone
+from typing import List, Dict
+from botocore.exceptions import ClientError
+import json
+import logging
+import random
+import time
+import uuid
+from strands_agents import tool
+from utils.aws_clients import get_client
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of put requests accepted by a single BatchWriteItem call
+DYNAMODB_BATCH_SIZE = 25
+
+# Retries for items DynamoDB reports back as unprocessed (throttled)
+MAX_UNPROCESSED_RETRIES = 3
+
+# Backoff before the first retry of unprocessed items, in seconds; doubled on
+# each further retry and jittered so concurrent writers don't retry in step
+UNPROCESSED_RETRY_BASE_DELAY = 0.1
+
+
+@tool
+def archive_items(
+    table_name: str,
+    item_type: str,
+    items: List[Dict],
+    key_field: str
+) -> int:
+    """
+    Persists items to a DynamoDB table using 25-item BatchWriteItem requests.
+    
+    Args:
+        table_name: DynamoDB table with string partition key 'item_id'
+        item_type: Kind of item being stored (e.g., 'suspicious_event', 'cost_anomaly')
+        items: Items to persist; each is stored as a JSON payload
+        key_field: Item field used as the partition key (a random ID is used if missing)
+    
+    Returns:
+        Number of items written
+    """
+    try:
+        dynamodb_client = get_client('dynamodb')
+        archived_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        written = 0
+        
+        for i in range(0, len(items), DYNAMODB_BATCH_SIZE):
+            requests = [
+                {
+                    'PutRequest': {
+                        'Item': {
+                            'item_id': {'S': str(item.get(key_field) or uuid.uuid4())},
+                            'item_type': {'S': item_type},
+                            'archived_at': {'S': archived_at},
+                            'payload': {'S': json.dumps(item, default=str)}
+                        }
+                    }
+                }
+                for item in items[i:i + DYNAMODB_BATCH_SIZE]
+            ]
+            
+            request_items = {table_name: requests}
+            for attempt in range(MAX_UNPROCESSED_RETRIES + 1):
+                if attempt:
+                    # Unprocessed items mean the table is throttling; retrying at
+                    # once would usually be throttled again
+                    time.sleep(random.uniform(0, UNPROCESSED_RETRY_BASE_DELAY * 2 ** attempt))
+                response = dynamodb_client.batch_write_item(RequestItems=request_items)
+                request_items = response.get('UnprocessedItems', {})
+                if not request_items:
+                    break
+            
+            unwritten = len(request_items.get(table_name, []))
+            if unwritten:
+                logger.warning(
+                    "%s %s items still unprocessed by %s after %s retries; not archived",
+                    unwritten, item_type, table_name, MAX_UNPROCESSED_RETRIES
+                )
+            written += len(requests) - unwritten
+        
+        return written
+    
+    except ClientError as e:
+        logger.error("AWS Error archiving %s items: %s", item_type, e)
+        return 0
+    except Exception as e:
+        logger.error("Error archiving %s items: %s", item_type, e)
+        return 0
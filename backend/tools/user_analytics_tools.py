@@ -1,10 +1,43 @@
 """User analytics tools for person-level tracking and cost attribution."""
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Dict, Optional, Tuple
 from collections import defaultdict
+from types import MappingProxyType
+import sys
+import time
+import numpy as np
 from strands_agents import tool
 from config import settings
 
+# Event names counted as high-risk in per-user usage metrics
+HIGH_RISK_EVENT_NAMES = frozenset({
+    "DeleteBucket", "TerminateInstances", "DeleteDBInstance",
+    "DeleteUser", "PutBucketPolicy", "AttachRolePolicy"
+})
+
+# Shared read-only defaults for absent event fields, so lookups don't
+# allocate an empty dict or list per event
+_EMPTY_MAPPING = MappingProxyType({})
+_EMPTY_SEQUENCE = ()
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECONDS_PER_DAY = 86_400_000_000
+
+# (events, len(events), index) for the events list most recently indexed by
+# identity, so summarizing every user of one batch scans the batch once
+_identity_index: Optional[Tuple[List[Dict], int, Dict[Optional[str], List[Dict]]]] = None
+
+
+if sys.version_info >= (3, 11):
+    # fromisoformat accepts a trailing Z for UTC from Python 3.11 on
+    _parse_ts = datetime.fromisoformat
+else:
+    def _parse_ts(value: str) -> datetime:
+        """Parse an ISO-8601 timestamp, accepting a trailing Z for UTC."""
+        if value.endswith("Z"):
+            value = value[:-1] + "+00:00"
+        return datetime.fromisoformat(value)
+
 
 @tool
 def aggregate_usage_by_user(
@@ -39,13 +72,12 @@ def aggregate_usage_by_user(
         "activity_score": 0
     })
     
-    high_risk_events = [
-        "DeleteBucket", "TerminateInstances", "DeleteDBInstance",
-        "DeleteUser", "PutBucketPolicy", "AttachRolePolicy"
-    ]
+    # CloudTrail times have second resolution and repeat across events, so
+    # each distinct string is parsed once per call
+    parsed_times = {}
     
     for event in events:
-        user_identity = event.get("user_identity", {})
+        user_identity = event.get("user_identity", _EMPTY_MAPPING)
         user_name = user_identity.get("userName") or user_identity.get("arn", "Unknown")
         user_arn = user_identity.get("arn", "")
         
@@ -65,7 +97,7 @@ def aggregate_usage_by_user(
         
         # Track high-risk events
         event_name = event.get("event_name", "")
-        if event_name in high_risk_events:
+        if event_name in HIGH_RISK_EVENT_NAMES:
             metrics["high_risk_events"] += 1
         
         # Track services and regions
@@ -89,20 +121,26 @@ def aggregate_usage_by_user(
         event_time_str = event.get("event_time")
         if event_time_str:
             try:
-                event_time = datetime.fromisoformat(event_time_str.replace("Z", "+00:00"))
+                event_time = parsed_times.get(event_time_str)
+                if event_time is None:
+                    event_time = parsed_times[event_time_str] = _parse_ts(event_time_str)
                 if not metrics["first_seen"] or event_time < metrics["first_seen"]:
                     metrics["first_seen"] = event_time
                 if not metrics["last_seen"] or event_time > metrics["last_seen"]:
                     metrics["last_seen"] = event_time
-            except:
+            except (AttributeError, TypeError, ValueError):
                 pass
     
     # Calculate activity score and convert sets to lists
+    # The clock is read once; naive timestamps are compared with naive local time
+    now_utc = datetime.now(timezone.utc)
+    now_local = datetime.now()
     result = {}
     for user_name, metrics in user_metrics.items():
-        # Convert sets to lists for JSON serialization
-        metrics["services_used"] = list(metrics["services_used"])
-        metrics["regions_used"] = list(metrics["regions_used"])
+        # Sets are kept for O(1) membership while aggregating; emit sorted lists
+        # so the output is JSON-serializable and matches the columnar aggregation
+        metrics["services_used"] = sorted(metrics["services_used"])
+        metrics["regions_used"] = sorted(metrics["regions_used"])
         metrics["event_types"] = dict(metrics["event_types"])
         
         # Calculate activity score (weighted by event types and recency)
@@ -115,7 +153,8 @@ def aggregate_usage_by_user(
         
         # Add recency bonus (more recent activity = higher score)
         if metrics["last_seen"]:
-            days_since_last = (datetime.now(metrics["last_seen"].tzinfo) - metrics["last_seen"]).days
+            last_seen = metrics["last_seen"]
+            days_since_last = ((now_utc if last_seen.tzinfo else now_local) - last_seen).days
             recency_bonus = max(0, 10 - days_since_last)
             activity_score += recency_bonus
         
@@ -132,6 +171,342 @@ def aggregate_usage_by_user(
     return result
 
 
+def events_to_columns(events: Iterable[Dict]) -> Dict[str, np.ndarray]:
+    """
+    Convert CloudTrail event dicts to one array per field used by the usage metrics.
+    Events are consumed one at a time, so a generator is never materialized.
+    
+    Args:
+        events: Parsed CloudTrail events (any iterable)
+    
+    Returns:
+        Dictionary of equal-length arrays: user_name, user_arn, event_name, service
+        and aws_region (int32 codes into the matching <field>_values array of
+        strings, numbered in order of first appearance; missing values are ""),
+        read_only and has_error (bool), event_time_us (epoch microseconds, UTC)
+        and has_time (bool)
+    """
+    # String fields repeat heavily (few users, services and regions), so each
+    # is dictionary-encoded as it is read: a small array of distinct values
+    # plus one integer code per event, which numpy groups without string sorts
+    user_names, user_arns, event_names, services, regions = {}, {}, {}, {}, {}
+    name_codes, arn_codes, event_name_codes, service_codes, region_codes = [], [], [], [], []
+    read_only, has_error, event_times = [], [], []
+    
+    for event in events:
+        user_identity = event.get("user_identity", _EMPTY_MAPPING)
+        user_name = user_identity.get("userName") or user_identity.get("arn", "Unknown") or ""
+        name_codes.append(user_names.setdefault(user_name, len(user_names)))
+        arn_codes.append(user_arns.setdefault(user_identity.get("arn") or "", len(user_arns)))
+        event_name_codes.append(event_names.setdefault(event.get("event_name") or "", len(event_names)))
+        service = (event.get("event_source") or "").split(".")[0]
+        service_codes.append(services.setdefault(service, len(services)))
+        region_codes.append(regions.setdefault(event.get("aws_region") or "", len(regions)))
+        read_only.append(bool(event.get("read_only", True)))
+        has_error.append(bool(event.get("error_code") or event.get("error_message")))
+        event_times.append(event.get("event_time"))
+    
+    event_time_us, has_time = _event_times_to_us(event_times)
+    
+    columns = {
+        "read_only": np.array(read_only, dtype=bool),
+        "has_error": np.array(has_error, dtype=bool),
+        "event_time_us": event_time_us,
+        "has_time": has_time
+    }
+    for field, codes, values in (
+        ("user_name", name_codes, user_names),
+        ("user_arn", arn_codes, user_arns),
+        ("event_name", event_name_codes, event_names),
+        ("service", service_codes, services),
+        ("aws_region", region_codes, regions)
+    ):
+        columns[field] = np.array(codes, dtype=np.int32)
+        columns[f"{field}_values"] = np.array(list(values), dtype=str)
+    return columns
+
+
+def _event_times_to_us(event_times: List[Optional[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Convert ISO-8601 event times to epoch microseconds (UTC) and a mask of valid times."""
+    # CloudTrail times are UTC with a Z suffix, which numpy parses in C once
+    # the suffix is dropped; other values are parsed one at a time
+    fast = []
+    slow = []
+    for i, value in enumerate(event_times):
+        if isinstance(value, str) and value.endswith("Z"):
+            fast.append(value[:-1])
+        else:
+            fast.append("NaT")
+            if value:
+                slow.append(i)
+    
+    try:
+        times = np.array(fast, dtype="datetime64[us]")
+    except ValueError:
+        times = np.full(len(fast), np.datetime64("NaT"), dtype="datetime64[us]")
+        slow = [i for i, value in enumerate(event_times) if value]
+    
+    event_time_us = times.view(np.int64)
+    for i in slow:
+        try:
+            event_time = _parse_ts(event_times[i])
+        except (AttributeError, TypeError, ValueError):
+            continue
+        if event_time.tzinfo is None:
+            event_time = event_time.replace(tzinfo=timezone.utc)
+        event_time_us[i] = (event_time - _EPOCH) // timedelta(microseconds=1)
+    
+    has_time = ~np.isnat(times)
+    event_time_us[~has_time] = 0
+    return event_time_us, has_time
+
+
+def _sorted_codes(codes: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, List[str]]:
+    """Recode dictionary codes so their order follows the sorted values."""
+    order = np.argsort(values)
+    rank = np.empty(len(values), dtype=np.int64)
+    rank[order] = np.arange(len(values))
+    return rank[codes], values[order].tolist()
+
+
+def _values_by_user(user_idx: np.ndarray, codes: np.ndarray, values: np.ndarray, user_count: int) -> List[List[str]]:
+    """Distinct non-empty values seen for each user, sorted."""
+    by_user = [[] for _ in range(user_count)]
+    nonempty = (values != "")[codes]
+    if nonempty.any():
+        ranks, distinct = _sorted_codes(codes[nonempty], values)
+        pairs = np.unique(user_idx[nonempty] * len(distinct) + ranks)
+        for user, rank in zip((pairs // len(distinct)).tolist(), (pairs % len(distinct)).tolist()):
+            by_user[user].append(distinct[rank])
+    return by_user
+
+
+def _counts_by_user(user_idx: np.ndarray, codes: np.ndarray, values: np.ndarray, user_count: int) -> List[Dict[str, int]]:
+    """Occurrences of each value for each user."""
+    by_user = [{} for _ in range(user_count)]
+    if len(codes):
+        ranks, distinct = _sorted_codes(codes, values)
+        pairs, counts = np.unique(user_idx * len(distinct) + ranks, return_counts=True)
+        for user, rank, count in zip(
+            (pairs // len(distinct)).tolist(),
+            (pairs % len(distinct)).tolist(),
+            counts.tolist()
+        ):
+            by_user[user][distinct[rank]] = count
+    return by_user
+
+
+def aggregate_usage_columnar(columns: Dict[str, np.ndarray]) -> Dict[str, Dict]:
+    """
+    Aggregate usage metrics by user from columnar events, grouping with numpy
+    instead of updating per-user dicts event by event.
+    
+    Args:
+        columns: Event columns as returned by events_to_columns
+    
+    Returns:
+        Dictionary mapping user identifiers to the same usage metrics as
+        aggregate_usage_by_user (timestamps normalized to UTC)
+    """
+    name_values = columns["user_name_values"]
+    keep = ((name_values != "") & (name_values != "Unknown"))[columns["user_name"]]
+    if not keep.all():
+        columns = {
+            field: values if field.endswith("_values") else values[keep]
+            for field, values in columns.items()
+        }
+    if not len(columns["user_name"]):
+        return {}
+    
+    # Codes number users in order of first appearance, like the per-event
+    # aggregation, so the distinct codes left after filtering are in order
+    user_codes, user_idx = np.unique(columns["user_name"], return_inverse=True)
+    user_idx = user_idx.ravel()
+    user_names = name_values[user_codes].tolist()
+    user_count = len(user_names)
+    
+    total = np.bincount(user_idx, minlength=user_count)
+    read = np.bincount(user_idx, weights=columns["read_only"], minlength=user_count).astype(np.int64)
+    write = total - read
+    high_risk = np.bincount(
+        user_idx,
+        weights=np.isin(columns["event_name_values"], list(HIGH_RISK_EVENT_NAMES))[columns["event_name"]],
+        minlength=user_count
+    ).astype(np.int64)
+    errors = np.bincount(user_idx, weights=columns["has_error"], minlength=user_count).astype(np.int64)
+    
+    # The per-event aggregation keeps the ARN of each user's latest event
+    last_event = np.zeros(user_count, dtype=np.int64)
+    np.maximum.at(last_event, user_idx, np.arange(len(user_idx)))
+    user_arns = columns["user_arn_values"][columns["user_arn"][last_event]].tolist()
+    
+    services = _values_by_user(user_idx, columns["service"], columns["service_values"], user_count)
+    regions = _values_by_user(user_idx, columns["aws_region"], columns["aws_region_values"], user_count)
+    event_types = _counts_by_user(user_idx, columns["event_name"], columns["event_name_values"], user_count)
+    
+    # First and last event time per user
+    has_time = columns["has_time"]
+    timed_users = user_idx[has_time]
+    timed_us = columns["event_time_us"][has_time]
+    first_seen = np.full(user_count, np.iinfo(np.int64).max)
+    last_seen = np.full(user_count, np.iinfo(np.int64).min)
+    np.minimum.at(first_seen, timed_users, timed_us)
+    np.maximum.at(last_seen, timed_users, timed_us)
+    seen = np.zeros(user_count, dtype=bool)
+    seen[timed_users] = True
+    
+    # Activity score weighted by event types, plus a bonus for recent activity
+    activity_scores = total * 1.0 + write * 2.0 + high_risk * 5.0 - errors * 0.5
+    now_us = time.time_ns() // 1000
+    days_since_last = np.where(seen, (now_us - last_seen) // _MICROSECONDS_PER_DAY, 0)
+    activity_scores += np.where(seen, np.maximum(0, 10 - days_since_last), 0)
+    
+    result = {}
+    for i, user_name in enumerate(user_names):
+        result[user_name] = {
+            "user_name": user_name,
+            "user_arn": user_arns[i],
+            "total_events": int(total[i]),
+            "read_events": int(read[i]),
+            "write_events": int(write[i]),
+            "high_risk_events": int(high_risk[i]),
+            "services_used": services[i],
+            "regions_used": regions[i],
+            "first_seen": (_EPOCH + timedelta(microseconds=int(first_seen[i]))).isoformat() if seen[i] else None,
+            "last_seen": (_EPOCH + timedelta(microseconds=int(last_seen[i]))).isoformat() if seen[i] else None,
+            "event_types": event_types[i],
+            "error_count": int(errors[i]),
+            "activity_score": round(float(activity_scores[i]), 2)
+        }
+    
+    return result
+
+
+def merge_usage_metrics(running: Dict[str, Dict], batch: Dict[str, Dict]) -> Dict[str, Dict]:
+    """
+    Fold one batch of per-user usage metrics into the metrics accumulated so far.
+    
+    Args:
+        running: Metrics accumulated from earlier batches (left unchanged)
+        batch: Metrics from aggregate_usage_by_user or aggregate_usage_columnar
+    
+    Returns:
+        New dictionary mapping users to merged metrics: counts and event types are
+        summed, services and regions unioned, first_seen/last_seen widened and the
+        activity score recomputed from the merged values
+    """
+    merged = dict(running)
+    now = datetime.now(timezone.utc)
+    
+    for user_name, metrics in batch.items():
+        previous = running.get(user_name)
+        if previous is None:
+            merged[user_name] = metrics
+            continue
+        
+        event_types = dict(previous.get("event_types", {}))
+        for event_name, count in metrics.get("event_types", {}).items():
+            event_types[event_name] = event_types.get(event_name, 0) + count
+        
+        combined = {
+            "user_name": user_name,
+            "user_arn": metrics.get("user_arn") or previous.get("user_arn", ""),
+            "services_used": sorted({*previous.get("services_used", ()), *metrics.get("services_used", ())}),
+            "regions_used": sorted({*previous.get("regions_used", ()), *metrics.get("regions_used", ())}),
+            "first_seen": _earliest(previous.get("first_seen"), metrics.get("first_seen")),
+            "last_seen": _latest(previous.get("last_seen"), metrics.get("last_seen")),
+            "event_types": event_types
+        }
+        for field in ("total_events", "read_events", "write_events", "high_risk_events", "error_count"):
+            combined[field] = previous.get(field, 0) + metrics.get(field, 0)
+        
+        # Same weighting and recency bonus as the per-batch aggregation
+        activity_score = (
+            combined["total_events"] * 1.0 +
+            combined["write_events"] * 2.0 +
+            combined["high_risk_events"] * 5.0 -
+            combined["error_count"] * 0.5
+        )
+        last_seen = _seen_time(combined["last_seen"])
+        if last_seen is not None:
+            activity_score += max(0, 10 - (now - last_seen).days)
+        combined["activity_score"] = round(activity_score, 2)
+        
+        merged[user_name] = combined
+    
+    return merged
+
+
+def merge_usage_summaries(running: Dict[str, Dict], batch: Dict[str, Dict]) -> Dict[str, Dict]:
+    """
+    Fold one batch of per-user usage summaries into the summaries accumulated so far.
+    
+    Args:
+        running: Summaries accumulated from earlier batches (left unchanged)
+        batch: get_user_usage_summary results for the same batch as the metrics
+    
+    Returns:
+        New dictionary mapping users to merged summaries: counts and the activity
+        timeline are summed, services unioned, last_activity widened and the
+        usage category recomputed from the merged total
+    """
+    merged = dict(running)
+    
+    for user_name, summary in batch.items():
+        previous = running.get(user_name)
+        if previous is None or previous.get("status") != "active":
+            merged[user_name] = summary
+            continue
+        if summary.get("status") != "active":
+            continue
+        
+        timeline = dict(previous.get("activity_timeline", {}))
+        for date_key, count in summary.get("activity_timeline", {}).items():
+            timeline[date_key] = timeline.get(date_key, 0) + count
+        
+        total_events = previous.get("total_events", 0) + summary.get("total_events", 0)
+        merged[user_name] = {
+            "user_name": user_name,
+            "status": "active",
+            "total_events": total_events,
+            "read_events": previous.get("read_events", 0) + summary.get("read_events", 0),
+            "write_events": previous.get("write_events", 0) + summary.get("write_events", 0),
+            "services_used": sorted({*previous.get("services_used", ()), *summary.get("services_used", ())}),
+            "usage_category": _usage_category(total_events),
+            "activity_timeline": timeline,
+            "last_activity": _latest(previous.get("last_activity") or None, summary.get("last_activity") or None) or ""
+        }
+    
+    return merged
+
+
+def _seen_time(value: Optional[str]) -> Optional[datetime]:
+    """Parse a first_seen/last_seen timestamp for comparison (naive times are UTC)."""
+    if not value:
+        return None
+    try:
+        seen = _parse_ts(value)
+    except (AttributeError, TypeError, ValueError):
+        return None
+    return seen if seen.tzinfo else seen.replace(tzinfo=timezone.utc)
+
+
+def _earliest(a: Optional[str], b: Optional[str]) -> Optional[str]:
+    """Return the earlier of two timestamps, ignoring missing or unparseable ones."""
+    a_time, b_time = _seen_time(a), _seen_time(b)
+    if a_time is None:
+        return b if b_time is not None else a
+    return b if b_time is not None and b_time < a_time else a
+
+
+def _latest(a: Optional[str], b: Optional[str]) -> Optional[str]:
+    """Return the later of two timestamps, ignoring missing or unparseable ones."""
+    a_time, b_time = _seen_time(a), _seen_time(b)
+    if a_time is None:
+        return b if b_time is not None else a
+    return b if b_time is not None and b_time > a_time else a
+
+
 @tool
 def attribute_costs_to_users(
     cost_data: List[Dict],
@@ -159,56 +534,87 @@ def attribute_costs_to_users(
         "cost_per_resource": 0.0
     })
     
+    # Without cost entries there is nothing to attribute
+    if not cost_data:
+        return {}
+    
     # First, aggregate resource usage by user from events
     user_resources = defaultdict(set)
     for event in events:
-        user_identity = event.get("user_identity", {})
+        user_identity = event.get("user_identity", _EMPTY_MAPPING)
         user_name = user_identity.get("userName") or user_identity.get("arn", "Unknown")
         
         if not user_name or user_name == "Unknown":
             continue
         
         # Extract resource ARNs from event
-        resources = event.get("resources", [])
+        resources = event.get("resources") or _EMPTY_SEQUENCE
         for resource in resources:
             resource_arn = resource.get("resourceName") or resource.get("resourceARN", "")
             if resource_arn:
                 user_resources[user_name].add(resource_arn)
         
         # Also check response elements for created resources
-        response_elements = event.get("response_elements", {})
+        response_elements = event.get("response_elements") or _EMPTY_MAPPING
         if "instancesSet" in response_elements:
-            for instance in response_elements.get("instancesSet", {}).get("items", []):
+            for instance in response_elements["instancesSet"].get("items", _EMPTY_SEQUENCE):
                 instance_id = instance.get("instanceId", "")
                 if instance_id:
-                    user_resources[user_name].add(f"ec2:{instance_id}")
+                    # Interned so an instance seen in many events is stored once
+                    user_resources[user_name].add(sys.intern(f"ec2:{instance_id}"))
+    
+    # Only the number of distinct resources per user is used from here on,
+    # so release the sets before attributing costs
+    resource_counts = {
+        user_name: len(resources)
+        for user_name, resources in user_resources.items()
+        if resources
+    }
+    del user_resources
+    
+    # Distribute cost proportionally based on resource usage
+    # In production, this would be more sophisticated
+    # Each user's share depends only on resource counts, so compute it once
+    # rather than re-summing every user's resources for each cost entry
+    total_resources = sum(resource_counts.values())
+    if total_resources == 0:
+        return {}
+    shares = [
+        (user_costs[user_name], resource_count / total_resources)
+        for user_name, resource_count in resource_counts.items()
+    ]
+    proportions = np.fromiter((proportion for _, proportion in shares), dtype=np.float64, count=len(shares))
     
     # Attribute costs based on resource usage
+    # This is a simplified attribution - in production, you'd use
+    # cost allocation tags, resource tags, or more sophisticated matching
+    service_totals = defaultdict(float)
+    region_totals = defaultdict(float)
+    date_totals = defaultdict(float)
     for cost_entry in cost_data:
-        # This is a simplified attribution - in production, you'd use
-        # cost allocation tags, resource tags, or more sophisticated matching
         cost_amount = float(cost_entry.get("Amount", 0))
-        service = cost_entry.get("Service", "Unknown")
-        region = cost_entry.get("Region", "Unknown")
+        service_totals[cost_entry.get("Service", "Unknown")] += cost_amount
+        region_totals[cost_entry.get("Region", "Unknown")] += cost_amount
         date = cost_entry.get("Date", "")
-        
-        # Distribute cost proportionally based on resource usage
-        # In production, this would be more sophisticated
-        total_resources = sum(len(resources) for resources in user_resources.values())
-        
-        if total_resources > 0:
-            for user_name, resources in user_resources.items():
-                if len(resources) > 0:
-                    proportion = len(resources) / total_resources
-                    user_cost = cost_amount * proportion
-                    
-                    user_costs[user_name]["user_name"] = user_name
-                    user_costs[user_name]["total_cost"] += user_cost
-                    user_costs[user_name]["service_costs"][service] += user_cost
-                    user_costs[user_name]["region_costs"][region] += user_cost
-                    if date:
-                        user_costs[user_name]["cost_by_date"][date] += user_cost
-                    user_costs[user_name]["resource_count"] = len(resources)
+        if date:
+            date_totals[date] += cost_amount
+    
+    # Every user gets the same share of every entry, so each breakdown is the
+    # outer product of the user proportions and the per-key cost totals
+    service_matrix = np.outer(proportions, list(service_totals.values())).tolist()
+    region_matrix = np.outer(proportions, list(region_totals.values())).tolist()
+    date_matrix = np.outer(proportions, list(date_totals.values())).tolist()
+    user_totals = (proportions * sum(service_totals.values())).tolist()
+    
+    for i, (costs, _) in enumerate(shares):
+        costs["total_cost"] = user_totals[i]
+        costs["service_costs"] = dict(zip(service_totals, service_matrix[i]))
+        costs["region_costs"] = dict(zip(region_totals, region_matrix[i]))
+        costs["cost_by_date"] = dict(zip(date_totals, date_matrix[i]))
+    
+    for user_name, costs in user_costs.items():
+        costs["user_name"] = user_name
+        costs["resource_count"] = resource_counts[user_name]
     
     # Calculate cost per resource
     result = {}
@@ -230,6 +636,26 @@ def attribute_costs_to_users(
     return result
 
 
+def _events_by_identity(events: List[Dict]) -> Dict[Optional[str], List[Dict]]:
+    """Group events under their userName and ARN, reusing the index of the same events list."""
+    global _identity_index
+    cached = _identity_index
+    if cached is not None and cached[0] is events and cached[1] == len(events):
+        return cached[2]
+    
+    index = defaultdict(list)
+    for event in events:
+        user_identity = event.get("user_identity", _EMPTY_MAPPING)
+        user_name = user_identity.get("userName")
+        user_arn = user_identity.get("arn")
+        index[user_name].append(event)
+        if user_arn != user_name:
+            index[user_arn].append(event)
+    
+    _identity_index = (events, len(events), index)
+    return index
+
+
 @tool
 def get_user_usage_summary(
     user_name: str,
@@ -247,11 +673,7 @@ def get_user_usage_summary(
     Returns:
         Detailed usage summary for the user
     """
-    user_events = [
-        e for e in events
-        if (e.get("user_identity", {}).get("userName") == user_name or
-            e.get("user_identity", {}).get("arn") == user_name)
-    ]
+    user_events = _events_by_identity(events).get(user_name, [])
     
     if not user_events:
         return {
@@ -260,42 +682,37 @@ def get_user_usage_summary(
             "message": f"No activity found for user {user_name}"
         }
     
-    # Calculate metrics
+    # Count reads, collect services, build the activity timeline and track
+    # the latest event time in one pass
     total_events = len(user_events)
-    read_events = sum(1 for e in user_events if e.get("read_only", True))
-    write_events = total_events - read_events
-    
-    # Get unique services
+    read_events = 0
     services = set()
+    timeline = defaultdict(int)
+    date_keys = {}
+    last_activity = ""
     for event in user_events:
+        if event.get("read_only", True):
+            read_events += 1
+        
         event_source = event.get("event_source", "")
         if event_source:
-            service = event_source.split(".")[0] if "." in event_source else event_source
-            services.add(service)
-    
-    # Get activity timeline
-    timeline = defaultdict(int)
-    for event in user_events:
+            services.add(event_source.split(".", 1)[0])
+        
         event_time_str = event.get("event_time", "")
         if event_time_str:
+            # CloudTrail times share the Z suffix, so string order is time order
+            if event_time_str > last_activity:
+                last_activity = event_time_str
             try:
-                event_time = datetime.fromisoformat(event_time_str.replace("Z", "+00:00"))
-                date_key = event_time.date().isoformat()
+                # Repeated timestamps map to their date without re-parsing
+                date_key = date_keys.get(event_time_str)
+                if date_key is None:
+                    date_key = date_keys[event_time_str] = _parse_ts(event_time_str).date().isoformat()
                 timeline[date_key] += 1
-            except:
+            except (AttributeError, TypeError, ValueError):
                 pass
     
-    # Calculate usage category
-    if total_events == 0:
-        usage_category = "inactive"
-    elif total_events < 10:
-        usage_category = "light"
-    elif total_events < 100:
-        usage_category = "moderate"
-    elif total_events < 500:
-        usage_category = "heavy"
-    else:
-        usage_category = "very_heavy"
+    write_events = total_events - read_events
     
     return {
         "user_name": user_name,
@@ -303,11 +720,21 @@ def get_user_usage_summary(
         "total_events": total_events,
         "read_events": read_events,
         "write_events": write_events,
-        "services_used": list(services),
-        "usage_category": usage_category,
+        "services_used": sorted(services),
+        "usage_category": _usage_category(total_events),
         "activity_timeline": dict(timeline),
-        "last_activity": max(
-            (e.get("event_time", "") for e in user_events),
-            default=""
-        )
+        "last_activity": last_activity
     }
+
+
+def _usage_category(total_events: int) -> str:
+    """Categorize a user's usage by their event count."""
+    if total_events == 0:
+        return "inactive"
+    elif total_events < 10:
+        return "light"
+    elif total_events < 100:
+        return "moderate"
+    elif total_events < 500:
+        return "heavy"
+    return "very_heavy"
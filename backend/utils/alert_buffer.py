@@ -0,0 +1,130 @@
+"""Buffered alert delivery that groups bursts of alerts into digests."""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_LEVELS = ["info", "warning", "error", "critical"]
+
+# Queued by stop(); the flusher delivers everything ahead of it and exits
+_STOP = object()
+
+
+def _severity_rank(severity: str) -> int:
+    """Rank a severity level (unknown levels rank lowest)."""
+    return SEVERITY_LEVELS.index(severity) if severity in SEVERITY_LEVELS else 0
+
+
+def build_digest(alerts: List[Dict], title: str) -> Dict:
+    """
+    Combine buffered alerts into a single notification.
+    
+    Args:
+        alerts: Alerts with 'subject', 'message' and 'severity' keys
+        title: Subject prefix used when more than one alert is combined
+    
+    Returns:
+        Dictionary with the digest subject, message and highest severity
+    """
+    if len(alerts) == 1:
+        return alerts[0]
+    
+    separator = "\n" + "-" * 40 + "\n"
+    return {
+        "subject": f"{title} ({len(alerts)} alerts)",
+        "message": "\n" + separator.join(alert["message"].strip() for alert in alerts) + "\n",
+        "severity": max((alert.get("severity", "info") for alert in alerts), key=_severity_rank)
+    }
+
+
+class AlertBuffer:
+    """
+    Collects alerts in an in-process queue and flushes them in batches.
+    A batch is delivered once it holds max_batch_size alerts or max_wait_seconds
+    have passed since its first alert, whichever comes first.
+    """
+    
+    def __init__(
+        self,
+        deliver: Callable[[List[Dict]], Awaitable],
+        max_batch_size: int = 50,
+        max_wait_seconds: float = 5.0
+    ):
+        self.deliver = deliver
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._bg_tasks: Set[asyncio.Task] = set()
+    
+    def start(self):
+        """Start the background flusher on the running event loop."""
+        if self._task and not self._task.done():
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._flush_loop())
+    
+    async def enqueue(self, alert: Dict):
+        """Queue an alert for the next digest."""
+        self.start()
+        await self._queue.put(alert)
+    
+    async def stop(self):
+        """Stop the flusher once every queued alert has been delivered."""
+        # A sentinel rather than task.cancel(): asyncio.wait_for can swallow a
+        # cancellation that races with a completed queue.get()
+        if self._task and not self._task.done():
+            await self._queue.put(_STOP)
+            await self._task
+        self._task = None
+        
+        # Let in-flight sends finish so no alert is lost on shutdown
+        if self._bg_tasks:
+            await asyncio.gather(*self._bg_tasks, return_exceptions=True)
+    
+    def dispatch(self, coro: Awaitable) -> asyncio.Task:
+        """Run an alert send in the background; failures are logged, not raised."""
+        task = asyncio.create_task(coro)
+        self._bg_tasks.add(task)
+        task.add_done_callback(self._on_dispatch_done)
+        return task
+    
+    def _on_dispatch_done(self, task: asyncio.Task):
+        """Forget a finished background send and report its failure, if any."""
+        self._bg_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error("Error sending alert: %s", task.exception())
+    
+    async def _flush_loop(self):
+        """Wait for alerts and deliver them in batches until stopped."""
+        loop = asyncio.get_running_loop()
+        while True:
+            alert = await self._queue.get()
+            if alert is _STOP:
+                return
+            batch = [alert]
+            deadline = loop.time() + self.max_wait_seconds
+            
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    alert = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if alert is _STOP:
+                    await self._deliver(batch)
+                    return
+                batch.append(alert)
+            
+            await self._deliver(batch)
+    
+    async def _deliver(self, batch: List[Dict]):
+        """Deliver a batch, keeping the flusher alive on failure."""
+        try:
+            await self.deliver(batch)
+        except Exception as e:
+            logger.error("Error delivering alert digest: %s", e)
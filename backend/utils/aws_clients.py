@@ -0,0 +1,22 @@
+"""Shared boto3 clients, created once per service and reused across tool calls."""
+import threading
+from functools import lru_cache
+import boto3
+from botocore.config import Config
+from config import settings
+
+# Connection pool large enough for concurrent tool calls (e.g. parallel S3
+# log downloads), with adaptive retries that back off when AWS throttles
+CLIENT_CONFIG = Config(max_pool_connections=64, retries={'max_attempts': 5, 'mode': 'adaptive'})
+
+# boto3 sessions are not thread-safe, so clients are created under a lock;
+# the clients themselves are safe to share between threads
+_session = boto3.Session()
+_session_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def get_client(service_name: str):
+    """Return the process-wide boto3 client for an AWS service in the configured region."""
+    with _session_lock:
+        return _session.client(service_name, region_name=settings.aws_region, config=CLIENT_CONFIG)
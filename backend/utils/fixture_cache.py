@@ -0,0 +1,64 @@
+"""Disk cache for generated sample data fixtures."""
+import hashlib
+import inspect
+import os
+import pickle
+import time
+from pathlib import Path
+from typing import Callable
+
+# Directory holding pickled fixtures
+CACHE_DIR = Path(os.getenv("XDG_CACHE_HOME", Path.home() / ".cache")) / "aws_track_agent"
+
+# Sample timestamps are relative to generation time, so fixtures are
+# regenerated once they are older than this
+FIXTURE_MAX_AGE_SECONDS = 24 * 3600
+
+
+def _fixture_key(fn: Callable, args: tuple, kwargs: dict) -> str:
+    """Hash the generator's source and arguments, so changing either regenerates the fixture."""
+    try:
+        source = inspect.getsource(fn)
+    except (OSError, TypeError):
+        source = f"{fn.__module__}.{fn.__qualname__}"
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(source.encode())
+    digest.update(repr((args, sorted(kwargs.items()))).encode())
+    return digest.hexdigest()
+
+
+def cached(name: str, fn: Callable, *args, **kwargs):
+    """
+    Return fn(*args, **kwargs), loading it from a pickled fixture when a fresh one exists.
+    
+    Args:
+        name: Fixture name used as the file name prefix
+        fn: Generator producing the fixture
+        *args: Positional arguments for fn
+        **kwargs: Keyword arguments for fn
+    
+    Returns:
+        The cached or newly generated fixture
+    """
+    path = CACHE_DIR / f"{name}-{_fixture_key(fn, args, kwargs)}.pkl"
+    
+    try:
+        if time.time() - path.stat().st_mtime < FIXTURE_MAX_AGE_SECONDS:
+            with path.open("rb") as f:
+                return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        pass
+    
+    result = fn(*args, **kwargs)
+    
+    # Best effort: an unwritable cache only costs regenerating next time
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with tmp_path.open("wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+    
+    return result
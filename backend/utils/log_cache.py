@@ -0,0 +1,48 @@
+"""On-disk cache of parsed CloudTrail log files, keyed by S3 ETag."""
+import hashlib
+import os
+import pickle
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+
+def _entry_path(cache_dir: str, cache_key: Tuple) -> Path:
+    """Hash a cache key (bucket, key, ETag and filters) to its entry file."""
+    digest = hashlib.blake2b(repr(cache_key).encode(), digest_size=16).hexdigest()
+    return Path(cache_dir) / digest[:2] / f"{digest}.pkl"
+
+
+def cached_log_events(cache_dir: str, cache_key: Tuple, load: Callable[[], List[Dict]]) -> List[Dict]:
+    """
+    Return a log file's parsed events from the cache, calling load() on a miss.
+    An S3 object's ETag changes whenever its content does, so entries never expire.
+    
+    Args:
+        cache_dir: Directory holding cache entries
+        cache_key: Tuple identifying the object version and the filters applied
+        load: Downloads and parses the log file; exceptions propagate uncached
+    
+    Returns:
+        List of events from the log file
+    """
+    path = _entry_path(cache_dir, cache_key)
+    
+    try:
+        with path.open("rb") as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        pass
+    
+    events = load()
+    
+    # Best effort: an unwritable cache only costs downloading again next time
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with tmp_path.open("wb") as f:
+            pickle.dump(events, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+    
+    return events
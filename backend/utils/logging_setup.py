@@ -0,0 +1,33 @@
+"""Logging configuration for AWS Track Agent."""
+import atexit
+import logging
+import logging.handlers
+import queue
+from typing import Optional
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging(level: int = logging.INFO):
+    """
+    Route all log records through a queue so stream I/O happens on a
+    background thread instead of the event loop.
+    
+    Args:
+        level: Root logger level
+    """
+    global _listener
+    if _listener is not None:
+        return
+    
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+    
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -0,0 +1,37 @@
+"""Token bucket rate limiting for quota-bound AWS API tools."""
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket limiter driven by the monotonic clock.
+    Bursts of up to capacity calls run immediately; beyond that, callers
+    wait cooperatively until the bucket refills at rate tokens per second.
+    """
+    
+    def __init__(self, rate: float, capacity: int):
+        # A bucket that cannot hold one token would make acquire() wait forever
+        if capacity < 1:
+            raise ValueError(f"Token bucket capacity must be at least 1, got {capacity}")
+        if rate <= 0:
+            raise ValueError(f"Token bucket rate must be positive, got {rate}")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+    
+    def _refill(self):
+        """Add the tokens accrued since the last refill."""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    async def acquire(self):
+        """Take one token, sleeping until one is available."""
+        while True:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
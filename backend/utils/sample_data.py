@@ -1,134 +1,195 @@
 """Sample data generators for testing AWS Track Agent."""
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import Iterator, List, Dict
 import random
 import uuid
+import numpy as np
+
+# Events generated per batch of random draws when streaming sample events
+SAMPLE_BATCH_SIZE = 4096
+
+# Sample event types
+SAMPLE_EVENT_TYPES = (
+    {"name": "RunInstances", "risk": "medium", "read_only": False},
+    {"name": "TerminateInstances", "risk": "high", "read_only": False},
+    {"name": "DeleteBucket", "risk": "high", "read_only": False},
+    {"name": "CreateUser", "risk": "medium", "read_only": False},
+    {"name": "DeleteUser", "risk": "high", "read_only": False},
+    {"name": "PutBucketPolicy", "risk": "high", "read_only": False},
+    {"name": "AttachRolePolicy", "risk": "high", "read_only": False},
+    {"name": "CreateAccessKey", "risk": "medium", "read_only": False},
+    {"name": "DescribeInstances", "risk": "low", "read_only": True},
+    {"name": "ListBuckets", "risk": "low", "read_only": True},
+    {"name": "GetObject", "risk": "low", "read_only": True},
+)
+
+# Sample users
+SAMPLE_USERS = (
+    "admin@example.com",
+    "developer@example.com",
+    "automation@example.com",
+    "unknown-user",
+)
+
+# Sample source IPs
+SAMPLE_SOURCE_IPS = (
+    "203.0.113.1",
+    "198.51.100.1",
+    "192.0.2.1",
+    "10.0.0.1",
+    "172.16.0.1",
+)
+
+# Event names swapped in for high-risk suspicious events
+SUSPICIOUS_EVENT_NAMES = ("TerminateInstances", "DeleteBucket", "DeleteUser")
+
+# Characters drawn for sample access key ids
+ACCESS_KEY_ALPHABET = np.frombuffer(b"ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789", dtype="S1")
+
+# Sample regions and user agents
+SAMPLE_REGIONS = ("us-east-1", "us-west-2", "eu-west-1")
+SAMPLE_USER_AGENTS = (
+    "aws-cli/2.0.0",
+    "Mozilla/5.0",
+    "bot-scanner",
+    "aws-sdk-python/1.20.0"
+)
+
+# Sample services with cost anomalies
+SAMPLE_COST_SERVICES = (
+    "Amazon EC2",
+    "Amazon S3",
+    "Amazon RDS",
+    "AWS Lambda",
+    "Amazon CloudFront",
+    "Amazon ECS",
+    "Amazon EKS",
+)
+
+# Sample cost anomaly dimensions
+SAMPLE_COST_DIMENSIONS = (
+    "us-east-1",
+    "us-west-2",
+    "production",
+    "development",
+    "team-alpha",
+    "team-beta",
+)
+
+# Sample users for analytics and cost attribution data
+SAMPLE_ANALYTICS_USERS = (
+    "alice@example.com",
+    "bob@example.com",
+    "charlie@example.com",
+    "diana@example.com",
+    "eve@example.com",
+    "frank@example.com",
+    "grace@example.com",
+    "henry@example.com",
+    "ivy@example.com",
+    "jack@example.com",
+)
 
 
 def generate_sample_cloudtrail_events(count: int = 10) -> List[Dict]:
     """Generate sample CloudTrail events for testing."""
-    events = []
-    
-    # Sample event types
-    event_types = [
-        {"name": "RunInstances", "risk": "medium", "read_only": False},
-        {"name": "TerminateInstances", "risk": "high", "read_only": False},
-        {"name": "DeleteBucket", "risk": "high", "read_only": False},
-        {"name": "CreateUser", "risk": "medium", "read_only": False},
-        {"name": "DeleteUser", "risk": "high", "read_only": False},
-        {"name": "PutBucketPolicy", "risk": "high", "read_only": False},
-        {"name": "AttachRolePolicy", "risk": "high", "read_only": False},
-        {"name": "CreateAccessKey", "risk": "medium", "read_only": False},
-        {"name": "DescribeInstances", "risk": "low", "read_only": True},
-        {"name": "ListBuckets", "risk": "low", "read_only": True},
-        {"name": "GetObject", "risk": "low", "read_only": True},
-    ]
-    
-    # Sample users
-    users = [
-        "admin@example.com",
-        "developer@example.com",
-        "automation@example.com",
-        "unknown-user",
-    ]
+    return list(iter_sample_cloudtrail_events(count))
+
+
+def iter_sample_cloudtrail_events(count: int = 10) -> Iterator[Dict]:
+    """Yield sample CloudTrail events, holding one batch of random draws at a time."""
+    rng = np.random.default_rng()
+    base_time = np.datetime64(datetime.utcnow(), "us")
+    for batch_start in range(0, count, SAMPLE_BATCH_SIZE):
+        yield from _sample_event_batch(rng, base_time, min(SAMPLE_BATCH_SIZE, count - batch_start))
+
+
+def _sample_event_batch(rng: np.random.Generator, base_time: np.datetime64, count: int) -> Iterator[Dict]:
+    """Yield count sample events from one batch of random draws."""
+    # Draw every random field for the batch at once, then convert to Python
+    # lists so the loop below only indexes native values
+    event_ids = _uuid4_strings(rng, count)
+    type_idxs = rng.integers(0, len(SAMPLE_EVENT_TYPES), size=count).tolist()
+    region_idxs = rng.integers(0, len(SAMPLE_REGIONS), size=count).tolist()
+    ip_idxs = rng.integers(0, len(SAMPLE_SOURCE_IPS), size=count).tolist()
+    agent_idxs = rng.integers(0, len(SAMPLE_USER_AGENTS), size=count).tolist()
+    arn_user_idxs = rng.integers(0, len(SAMPLE_USERS), size=count).tolist()
+    user_idxs = rng.integers(0, len(SAMPLE_USERS), size=count).tolist()
+    principal_ids = rng.integers(1000000000, 10000000000, size=count).tolist()
+    access_key_ids = _access_key_ids(rng, count)
     
-    # Sample source IPs
-    source_ips = [
-        "203.0.113.1",
-        "198.51.100.1",
-        "192.0.2.1",
-        "10.0.0.1",
-        "172.16.0.1",
-    ]
+    # Formatted as UTC ISO-8601 strings with the "Z" suffix in one call
+    offset_minutes = rng.integers(0, 61, size=count).astype("timedelta64[m]")
+    event_times = np.datetime_as_string(base_time - offset_minutes, unit="us", timezone="UTC").tolist()
     
-    base_time = datetime.utcnow()
+    # Generate suspicious events (20% chance), each indicator drawn independently
+    suspicious = rng.random(count) < 0.2
+    high_risk = (suspicious & (rng.random(count) < 0.5)).tolist()
+    high_risk_idxs = rng.integers(0, len(SUSPICIOUS_EVENT_NAMES), size=count).tolist()
+    errored = (suspicious & (rng.random(count) < 0.3)).tolist()
+    bot_agent = (suspicious & (rng.random(count) < 0.3)).tolist()
+    bad_ip = (suspicious & (rng.random(count) < 0.3)).tolist()
     
     for i in range(count):
-        event_type = random.choice(event_types)
-        event_time = base_time - timedelta(minutes=random.randint(0, 60))
-        
-        # Generate suspicious events (20% chance)
-        is_suspicious = random.random() < 0.2
+        event_type = SAMPLE_EVENT_TYPES[type_idxs[i]]
+        is_instance_event = "Instance" in event_type["name"]
         
         event = {
-            "eventID": str(uuid.uuid4()),
-            "eventTime": event_time.isoformat() + "Z",
-            "eventName": event_type["name"],
-            "eventSource": "ec2.amazonaws.com" if "Instance" in event_type["name"] else "s3.amazonaws.com",
-            "awsRegion": random.choice(["us-east-1", "us-west-2", "eu-west-1"]),
-            "sourceIPAddress": random.choice(source_ips),
-            "userAgent": random.choice([
-                "aws-cli/2.0.0",
-                "Mozilla/5.0",
-                "bot-scanner",
-                "aws-sdk-python/1.20.0"
-            ]),
+            "eventID": event_ids[i],
+            "eventTime": event_times[i],
+            "eventName": SUSPICIOUS_EVENT_NAMES[high_risk_idxs[i]] if high_risk[i] else event_type["name"],
+            "eventSource": "ec2.amazonaws.com" if is_instance_event else "s3.amazonaws.com",
+            "awsRegion": SAMPLE_REGIONS[region_idxs[i]],
+            # Unusual (invalid) source IP for some suspicious events
+            "sourceIPAddress": "203.0.113.999" if bad_ip[i] else SAMPLE_SOURCE_IPS[ip_idxs[i]],
+            "userAgent": "bot-scanner" if bot_agent[i] else SAMPLE_USER_AGENTS[agent_idxs[i]],
             "userIdentity": {
                 "type": "IAMUser",
-                "principalId": f"AIDA{random.randint(1000000000, 9999999999)}",
-                "arn": f"arn:aws:iam::123456789012:user/{random.choice(users)}",
+                "principalId": f"AIDA{principal_ids[i]}",
+                "arn": f"arn:aws:iam::123456789012:user/{SAMPLE_USERS[arn_user_idxs[i]]}",
                 "accountId": "123456789012",
-                "userName": random.choice(users),
-                "accessKeyId": f"AKIA{''.join(random.choices('ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789', k=16))}"
+                "userName": SAMPLE_USERS[user_idxs[i]],
+                "accessKeyId": f"AKIA{access_key_ids[i]}"
             },
             "resources": [],
             "requestParameters": {
-                "instanceType": "t2.micro" if "Instance" in event_type["name"] else None
+                "instanceType": "t2.micro" if is_instance_event else None
             },
             "responseElements": {},
             "readOnly": event_type["read_only"],
             "managementEvent": True
         }
         
-        # Add suspicious indicators
-        if is_suspicious:
-            # High-risk event
-            if random.random() < 0.5:
-                event["eventName"] = random.choice(["TerminateInstances", "DeleteBucket", "DeleteUser"])
-            
-            # Error (unauthorized attempt)
-            if random.random() < 0.3:
-                event["errorCode"] = "AccessDenied"
-                event["errorMessage"] = "User is not authorized to perform this operation"
-            
-            # Suspicious user agent
-            if random.random() < 0.3:
-                event["userAgent"] = "bot-scanner"
-            
-            # Unusual source IP
-            if random.random() < 0.3:
-                event["sourceIPAddress"] = "203.0.113.999"  # Invalid IP
+        # Error (unauthorized attempt)
+        if errored[i]:
+            event["errorCode"] = "AccessDenied"
+            event["errorMessage"] = "User is not authorized to perform this operation"
         
-        events.append(event)
-    
-    return events
+        yield event
+
+
+def _uuid4_strings(rng: np.random.Generator, count: int) -> List[str]:
+    """Format count random version-4 UUIDs, drawing their bytes in one call."""
+    raw = np.frombuffer(bytearray(rng.bytes(16 * count)), dtype=np.uint8).reshape(count, 16)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    digits = raw.tobytes().hex()
+    return [
+        f"{digits[i:i + 8]}-{digits[i + 8:i + 12]}-{digits[i + 12:i + 16]}-{digits[i + 16:i + 20]}-{digits[i + 20:i + 32]}"
+        for i in range(0, 32 * count, 32)
+    ]
+
+
+def _access_key_ids(rng: np.random.Generator, count: int) -> List[str]:
+    """Draw count random 16-character access key id suffixes."""
+    chars = rng.choice(ACCESS_KEY_ALPHABET, size=(count, 16))
+    return chars.view("S16").ravel().astype(str).tolist()
 
 
 def generate_sample_cost_anomalies(count: int = 5) -> List[Dict]:
     """Generate sample cost anomalies for testing."""
     anomalies = []
     
-    # Sample services
-    services = [
-        "Amazon EC2",
-        "Amazon S3",
-        "Amazon RDS",
-        "AWS Lambda",
-        "Amazon CloudFront",
-        "Amazon ECS",
-        "Amazon EKS",
-    ]
-    
-    # Sample dimensions
-    dimensions = [
-        "us-east-1",
-        "us-west-2",
-        "production",
-        "development",
-        "team-alpha",
-        "team-beta",
-    ]
-    
     base_date = datetime.now()
     
     for i in range(count):
@@ -161,13 +222,13 @@ def generate_sample_cost_anomalies(count: int = 5) -> List[Dict]:
                 }
             },
             "root_cause": [
-                f"Unusual usage in {random.choice(services)}",
-                f"Increased activity in {random.choice(dimensions)}",
+                f"Unusual usage in {random.choice(SAMPLE_COST_SERVICES)}",
+                f"Increased activity in {random.choice(SAMPLE_COST_DIMENSIONS)}",
                 "New resource deployment",
                 "Configuration change"
             ][:random.randint(1, 3)],
             "monitor_arn": f"arn:aws:ce::123456789012:anomalymonitor/{uuid.uuid4().hex[:8]}",
-            "dimension_value": random.choice(dimensions),
+            "dimension_value": random.choice(SAMPLE_COST_DIMENSIONS),
             "feedback": None,
             "status": random.choice(["OPEN", "CLOSED"]),
             "date": anomaly_date.strftime("%Y-%m-%d")
@@ -202,23 +263,10 @@ def generate_sample_dashboard_stats() -> Dict:
 
 def generate_sample_user_analytics(count: int = 20) -> Dict:
     """Generate sample user analytics data."""
-    users = [
-        "alice@example.com",
-        "bob@example.com",
-        "charlie@example.com",
-        "diana@example.com",
-        "eve@example.com",
-        "frank@example.com",
-        "grace@example.com",
-        "henry@example.com",
-        "ivy@example.com",
-        "jack@example.com",
-    ]
-    
     user_metrics = {}
     base_time = datetime.now()
     
-    for i, user_name in enumerate(users[:count]):
+    for i, user_name in enumerate(SAMPLE_ANALYTICS_USERS[:count]):
         total_events = random.randint(10, 500)
         activity_score = random.uniform(50, 500)
         
@@ -247,22 +295,9 @@ def generate_sample_user_analytics(count: int = 20) -> Dict:
 
 def generate_sample_user_costs(count: int = 20) -> Dict:
     """Generate sample user cost attribution data."""
-    users = [
-        "alice@example.com",
-        "bob@example.com",
-        "charlie@example.com",
-        "diana@example.com",
-        "eve@example.com",
-        "frank@example.com",
-        "grace@example.com",
-        "henry@example.com",
-        "ivy@example.com",
-        "jack@example.com",
-    ]
-    
     user_costs = {}
     
-    for i, user_name in enumerate(users[:count]):
+    for i, user_name in enumerate(SAMPLE_ANALYTICS_USERS[:count]):
         total_cost = random.uniform(100, 5000)
         
         user_costs[user_name] = {
@@ -0,0 +1,110 @@
+"""Tool execution shared by the agent base classes: executor, rate limits and streaming."""
+import asyncio
+import concurrent.futures
+import functools
+import inspect
+from collections import defaultdict
+from typing import AsyncIterator, Callable, Dict, Optional, Tuple
+from utils.rate_limit import TokenBucket
+
+# Returned by next() once a streaming tool is exhausted
+_END = object()
+
+
+def _close_after(job: concurrent.futures.Future, iterator):
+    """Close a sync generator once its in-flight next() has returned (runs in the executor)."""
+    concurrent.futures.wait([job])
+    close = getattr(iterator, "close", None)
+    if close:
+        close()
+
+
+class ToolRuntimeMixin:
+    """
+    Runs an agent's tools: async tools are awaited, sync tools run in a thread
+    pool so they don't block the event loop, and generator tools are streamed.
+    Classes using it call _init_tool_runtime() from __init__ and register
+    tools with _register_tool().
+    """
+    
+    __slots__ = ()
+    
+    def _init_tool_runtime(self):
+        """Set up the tool table, executor, call counters and rate limits."""
+        # Resolved once at registration: tool name -> (func, is_coroutine)
+        self._tool_entries: Dict[str, Tuple[Callable, bool]] = {}
+        # Synchronous (e.g. boto3) tools run here so they don't block the event loop
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=16)
+        self.tool_call_counts = defaultdict(int)
+        self._rate_limits: Dict[str, TokenBucket] = {}
+        self.on_state_change: Optional[Callable[[], None]] = None  # called by notify_state_change()
+    
+    def _register_tool(self, name: str, func: Callable):
+        """Add a tool to the table under the given name."""
+        self._tool_entries[name] = (func, asyncio.iscoroutinefunction(func))
+    
+    def _tool_entry(self, tool_name: str) -> Tuple[Callable, bool]:
+        """Look up a registered tool. Raises ValueError for unknown tools."""
+        entry = self._tool_entries.get(tool_name)
+        if entry is None:
+            raise ValueError(f"Tool '{tool_name}' not found. Available: {list(self._tool_entries)}")
+        return entry
+    
+    def notify_state_change(self):
+        """Tell the owner (e.g. the API's status cache) that get_status() output changed."""
+        if self.on_state_change:
+            self.on_state_change()
+    
+    def limit_tool_rate(self, tool_name: str, rate: float, burst: int):
+        """Throttle calls to a tool to rate per second, allowing bursts of up to burst calls."""
+        if rate <= 0:
+            self._rate_limits.pop(tool_name, None)
+        else:
+            self._rate_limits[tool_name] = TokenBucket(rate, burst)
+    
+    async def _before_call(self, tool_name: str):
+        """Count a tool call and wait for its rate limit, if any."""
+        self.tool_call_counts[tool_name] += 1
+        bucket = self._rate_limits.get(tool_name)
+        if bucket:
+            await bucket.acquire()
+    
+    async def execute_tool(self, tool_name: str, **kwargs):
+        """Execute a tool by name: async tools are awaited, sync tools run in the executor."""
+        func, is_coro = self._tool_entry(tool_name)
+        await self._before_call(tool_name)
+        
+        if is_coro:
+            return await func(**kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, **kwargs))
+    
+    async def execute_tool_stream(self, tool_name: str, **kwargs) -> AsyncIterator:
+        """Execute a generator tool by name, yielding its items as they are produced."""
+        func, _ = self._tool_entry(tool_name)
+        await self._before_call(tool_name)
+        
+        if inspect.isasyncgenfunction(func):
+            async for item in func(**kwargs):
+                yield item
+            return
+        
+        # Sync generators are advanced in the executor; the next item is
+        # fetched while the caller is still processing the current one
+        loop = asyncio.get_running_loop()
+        iterator = iter(func(**kwargs))
+        job = self._executor.submit(next, iterator, _END)
+        try:
+            while True:
+                item = await asyncio.wrap_future(job)
+                if item is _END:
+                    return
+                job = self._executor.submit(next, iterator, _END)
+                yield item
+        finally:
+            # When the caller stops early, a next() already running in the
+            # executor can't be cancelled; wait for it, then close the
+            # generator so its own cleanup (e.g. shutting down a download
+            # pool) runs now rather than whenever it is garbage collected
+            job.cancel()
+            await loop.run_in_executor(self._executor, _close_after, job, iterator)